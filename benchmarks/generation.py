@@ -0,0 +1,315 @@
+"""
+================================================================================
+BENCHMARK - GENERATION, SAVE AND RECALCULATION COST BY HEADCOUNT
+================================================================================
+
+Builds the evaluation workbook from synthetic QC and Production rosters of
+each requested size and times every stage separately:
+
+    derive   derived columns (TotalWorkHrs, ProdToQCRatio, Consistency) from
+             raw rosters, as Excel_Maker.py does after loading
+    build    laying out both sheets and the instructions (populate_workbook)
+    save     the writer's save, plus embedding cached values with
+             --precompute-values (openpyxl)
+    recalc   recalculating every formula in a headless evaluator: the
+             `formulas` library, or LibreOffice (soffice --headless)
+
+Each size runs in a fresh process, so the reported peak RSS belongs to that
+size alone. Recalculated FINAL SCORE and RANK values are checked against
+scoring.score; a mismatch means the builders and the scoring engine have
+drifted apart. Results, with the environment, are written as JSON; given a
+--baseline from an earlier run, stages slower by more than --tolerance are
+reported and the exit status is 1.
+
+With streaming_write, and always with --writer xlsxwriter, the rows go to
+disk while the sheets are built, so "build" includes most of the writing and
+"save" only packs the file.
+
+Usage:
+    python benchmarks/generation.py --rows 10 100 1000 10000 -o bench.json
+    python benchmarks/generation.py --rows 1000000 --streaming-write --recalc none
+    python benchmarks/generation.py --rows 1000 100000 --writer xlsxwriter
+    python benchmarks/generation.py --baseline bench.json --tolerance 1.25
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+STAGES = ('derive', 'build', 'save', 'recalc')
+OPTIONS = ('hoist_column_stats', 'streaming_write', 'precompute_values', 'sorted_rank_helper')
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None where unavailable."""
+    # Linux carries ru_maxrss over from the parent into a spawned process;
+    # VmHWM starts again with the new program
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def synthetic_sources(n, seed=0):
+    """Raw QC and Production rosters of `n` employees each, with ingest's dtypes."""
+    import numpy as np
+    import pandas as pd
+
+    from ingest import PROD_DTYPES, QC_DTYPES
+
+    rng = np.random.default_rng(seed)
+
+    def common(prefix):
+        return {
+            'Name': [f"{prefix}{i}" for i in range(n)],
+            'LeaveH': rng.uniform(0, 150, n).round(1),
+            'ProductionH': rng.uniform(350, 800, n).round(1),
+            'DistinctTasks': rng.integers(5, 20, n),
+            'ProjectsWorked': rng.integers(15, 40, n),
+            'TotalTasks': rng.integers(30, 200, n),
+        }
+
+    qc = pd.DataFrame({**common("QC"), 'QCworkH': rng.uniform(150, 350, n).round(1),
+                       'TLScore': rng.integers(10, 21, n)}).astype(QC_DTYPES)
+    prod = pd.DataFrame({**common("Prod"), 'QCcheckingH': rng.uniform(60, 150, n).round(1),
+                         'AvgEvaluation': rng.uniform(7, 9, n).round(3)}).astype(PROD_DTYPES)
+    consistency = dict(zip(prod['Name'].astype(str), rng.uniform(0.7, 0.95, n).round(2)))
+    return qc, prod, consistency
+
+
+def derive(qc, prod, consistency):
+    """The rosters Excel_Maker.py builds from, from raw sources."""
+    from ingest import derive_prod, derive_qc, widen_floats
+
+    qc_data = widen_floats(derive_qc(qc.copy()))
+    prod_data = derive_prod(prod.copy())
+    prod_data['Consistency'] = prod_data['Name'].astype(str).map(consistency).astype('float32')
+    return qc_data, widen_floats(prod_data)
+
+
+def recalculate_formulas(path):
+    """Recalculate with the `formulas` library; returns {(sheet, coordinate): value}."""
+    os.environ.setdefault('TQDM_DISABLE', '1')  # formulas' progress bars
+    import formulas
+
+    solution = formulas.ExcelModel().loads(path).finish().calculate()
+    values = {}
+    for key, ranges in solution.items():
+        # keys look like "'[file.xlsx]SHEET'!H9"
+        book_sheet, _, coordinate = key.rpartition('!')
+        if ':' in coordinate or ']' not in book_sheet:
+            continue
+        sheet = book_sheet.strip("'").split(']', 1)[1]
+        values[(sheet.upper(), coordinate)] = ranges.value[0, 0]
+    return values
+
+
+def recalculate_libreoffice(path, workdir):
+    """Recalculate by round-tripping through headless LibreOffice; returns {(sheet, coordinate): value}."""
+    from openpyxl import load_workbook
+
+    soffice = shutil.which('soffice') or shutil.which('libreoffice')
+    if soffice is None:
+        raise RuntimeError("LibreOffice (soffice) is not on PATH")
+    out_dir = os.path.join(workdir, 'recalculated')
+    subprocess.run([soffice, '--headless', '--calc', '--convert-to', 'xlsx', '--outdir', out_dir, path],
+                   check=True, capture_output=True)
+    wb = load_workbook(os.path.join(out_dir, os.path.basename(path)), data_only=True, read_only=True)
+    values = {}
+    for ws in wb.worksheets:
+        for row in ws.iter_rows():
+            for cell in row:
+                if cell.value is not None:
+                    values[(ws.title.upper(), cell.coordinate)] = cell.value
+    return values
+
+
+def check_recalculation(values, rosters):
+    """Max |FINAL SCORE - scoring.score| and the number of differing RANKs."""
+    import numpy as np
+
+    from schema import FIRST_DATA_ROW, layout
+    from scoring import score
+
+    max_error, rank_mismatches = 0.0, 0
+    for team, df in rosters:
+        expected = score(df, metrics=team.metrics)
+        lay = layout(team)
+        rows = range(FIRST_DATA_ROW, FIRST_DATA_ROW + len(df))
+        sheet = team.sheet.upper()
+        got = np.array([float(values[(sheet, f'{lay.score}{r}')]) for r in rows])
+        ranks = np.array([int(values[(sheet, f'{lay.rank}{r}')]) for r in rows])
+        max_error = max(max_error, float(np.max(np.abs(got - expected['FinalScore'].to_numpy()))))
+        rank_mismatches += int(np.sum(ranks != expected['Rank'].to_numpy()))
+    return max_error, rank_mismatches
+
+
+def run_case(rows, options, recalc, recalc_max_rows, seed=0):
+    """Time every stage for one roster size; runs in its own process."""
+    from builder import populate_workbook, save_workbook
+    from schema import PROD_TEAM, QC_TEAM
+
+    qc, prod, consistency = synthetic_sources(rows, seed)
+    result = {'rows': rows, 'options': options, 'seconds': {}}
+    seconds = result['seconds']
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'Performance_Evaluation_Customizable.xlsx')
+
+        start = time.perf_counter()
+        qc_data, prod_data = derive(qc, prod, consistency)
+        seconds['derive'] = time.perf_counter() - start
+
+        rosters = [(QC_TEAM, qc_data), (PROD_TEAM, prod_data)]
+        start = time.perf_counter()
+        out, cached = populate_workbook(rosters, verbose=False, **options)
+        seconds['build'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        save_workbook(out, path, cached)
+        seconds['save'] = time.perf_counter() - start
+        del out, cached
+
+        result['output_bytes'] = os.path.getsize(path)
+        result['peak_rss_bytes'] = peak_rss_bytes()
+
+        if recalc != 'none' and rows <= recalc_max_rows:
+            result['recalc_engine'] = recalc
+            start = time.perf_counter()
+            try:
+                if recalc == 'formulas':
+                    values = recalculate_formulas(path)
+                else:
+                    values = recalculate_libreoffice(path, workdir)
+                seconds['recalc'] = time.perf_counter() - start
+                result['recalc_max_abs_error'], result['recalc_rank_mismatches'] = \
+                    check_recalculation(values, rosters)
+            except Exception as exc:  # e.g. a function the evaluator does not implement
+                result['recalc_error'] = f"{type(exc).__name__}: {exc}"
+            result['peak_rss_with_recalc_bytes'] = peak_rss_bytes()
+    return result
+
+
+def environment():
+    import numpy
+    import openpyxl
+    import pandas
+
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'openpyxl': openpyxl.__version__,
+    }
+
+
+def regressions(results, baseline, tolerance):
+    """Stages slower than `tolerance` x the baseline run with the same rows and options."""
+    previous = {(entry['rows'], json.dumps(entry['options'], sort_keys=True)): entry
+                for entry in baseline['results']}
+    found = []
+    for entry in results:
+        before = previous.get((entry['rows'], json.dumps(entry['options'], sort_keys=True)))
+        if before is None:
+            continue
+        for stage, elapsed in entry['seconds'].items():
+            old = before['seconds'].get(stage)
+            # Sub-10 ms stages are mostly noise
+            if old and elapsed > 0.01 and elapsed > old * tolerance:
+                found.append((entry['rows'], stage, old, elapsed))
+    return found
+
+
+def _fmt(value, unit):
+    return f"{value:8.2f}{unit}" if value is not None else f"{'-':>9}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time workbook generation stages by headcount.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10, 100, 1000, 10_000, 100_000],
+                        help="employees per roster (QC and Production each)")
+    for option in OPTIONS:
+        parser.add_argument('--' + option.replace('_', '-'), action='store_true')
+    parser.add_argument('--writer', choices=('openpyxl', 'xlsxwriter'), default='openpyxl',
+                        help="xlsx library behind the builders (see writers.py)")
+    parser.add_argument('--recalc', choices=('formulas', 'libreoffice', 'none'), default='formulas',
+                        help="headless evaluator for the recalculation stage")
+    parser.add_argument('--recalc-max-rows', type=int, default=1000,
+                        help="skip recalculation above this many rows (the evaluators are slow)")
+    parser.add_argument('-o', '--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="earlier results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help="slowdown factor over the baseline that counts as a regression")
+    args = parser.parse_args()
+
+    options = {option: getattr(args, option) for option in OPTIONS}
+    if args.writer != 'openpyxl':
+        # Only non-default writers are recorded, so earlier baselines still match
+        options['writer'] = args.writer
+    results = []
+    print(f"{'rows':>9} " + ''.join(f"{stage:>9} " for stage in STAGES) + f"{'peak RSS':>10} {'file':>9}")
+    for rows in args.rows:
+        # A fresh process per size keeps peak RSS per size
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+            result = pool.submit(run_case, rows, options, args.recalc, args.recalc_max_rows).result()
+        results.append(result)
+        peak = result['peak_rss_bytes']
+        print(f"{rows:>9,} "
+              + ''.join(_fmt(result['seconds'].get(stage), 's') + ' ' for stage in STAGES)
+              + _fmt(peak / 2**20 if peak else None, 'MB') + ' '
+              + _fmt(result['output_bytes'] / 2**20, 'MB'))
+        if 'recalc_error' in result:
+            print(f"{'':>9} recalc failed: {result['recalc_error']}")
+        elif 'recalc_max_abs_error' in result:
+            print(f"{'':>9} recalc vs scoring.score: max |error| {result['recalc_max_abs_error']:.2e}, "
+                  f"{result['recalc_rank_mismatches']} rank mismatches")
+
+    report = {'environment': environment(), 'results': results}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Results saved: {args.output}")
+
+    failed = any(result.get('recalc_max_abs_error', 0) > 1e-6 or result.get('recalc_rank_mismatches', 0)
+                 for result in results)
+    if failed:
+        print("✗ recalculated scores differ from scoring.score")
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            slower = regressions(results, json.load(f), args.tolerance)
+        for rows, stage, old, new in slower:
+            print(f"✗ {rows:,} rows, {stage}: {old:.3f}s -> {new:.3f}s ({new / old:.2f}x)")
+        if not slower:
+            print(f"✓ No stage slower than {args.tolerance:g}x the baseline")
+        failed = failed or bool(slower)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+================================================================================
+BENCHMARK - IMPORT TIME OF THE LIBRARY ENTRY POINT
+================================================================================
+
+Imports Excel_Maker in fresh interpreters and reports the median import time
+from `python -X importtime` (cumulative microseconds of the module itself,
+excluding interpreter startup). Also checks that the import does not pull in
+pandas, numpy or openpyxl and does not write any file. Exits with status 1
+if the median exceeds the budget.
+
+Usage:
+    python benchmarks/import_time.py --runs 10 --budget-ms 50
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl')
+
+PROBE = f"""
+import os, sys
+sys.path.insert(0, {os.path.abspath(ROOT)!r})
+import Excel_Maker
+print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+print(','.join(os.listdir('.')))
+"""
+
+
+def import_once(module='Excel_Maker'):
+    """Return (import microseconds, heavy modules loaded, files written) for one fresh interpreter."""
+    with tempfile.TemporaryDirectory() as cwd:
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE], cwd=cwd,
+                              capture_output=True, text=True, check=True)
+    micros = None
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            micros = int(parts[1])
+    heavy, written = (proc.stdout.splitlines() + ['', ''])[:2]
+    return micros, [m for m in heavy.split(',') if m], [f for f in written.split(',') if f]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time `import Excel_Maker`.")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.runs):
+        micros, heavy, written = import_once()
+        if heavy:
+            sys.exit(f"import loaded heavy modules: {', '.join(heavy)}")
+        if written:
+            sys.exit(f"import wrote files: {', '.join(written)}")
+        timings.append(micros / 1000)
+
+    median = statistics.median(timings)
+    print(f"import Excel_Maker  median {median:6.1f} ms  "
+          f"min {min(timings):6.1f} ms  max {max(timings):6.1f} ms  ({args.runs} runs)")
+    print(f"budget {args.budget_ms:.0f} ms: {'OK' if median <= args.budget_ms else 'EXCEEDED'}")
+    if median > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+================================================================================
+BENCHMARK - MEMORY PER EMPLOYEE: WIDENED DATAFRAMES vs. COMPACT ROSTERS
+================================================================================
+
+Writes synthetic QC and Production exports to CSV, then loads them with
+ingest.py two ways and scores them:
+
+    frame    widen_floats DataFrames (float64 metrics), what the pipeline
+             held before roster.Roster
+    roster   roster.Roster records (float32 arrays, interned names), what
+             Excel_Maker.py, shards.py and service.py hold
+
+For each, in a fresh process, it reports the bytes the two rosters hold per
+employee, the time to load and score them, the peak RSS of the run and how
+far the peak rose above the process's RSS before loading (the interpreter
+and libraries); --build also builds and saves the workbook with
+STREAMING_WRITE. With --max-rss-mb the exit status is 1 when the roster
+run peaks above that cap, which makes a 1M-row run usable as a memory check.
+
+Usage:
+    python benchmarks/roster_memory.py --rows 100000 1000000
+    python benchmarks/roster_memory.py --rows 1000000 --max-rss-mb 1024
+    python benchmarks/roster_memory.py --rows 100000 --build
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from generation import peak_rss_bytes, synthetic_sources  # noqa: E402
+
+KINDS = ('frame', 'roster')
+
+
+def write_sources(workdir, rows, seed=0):
+    """Write the synthetic exports as CSV; returns (qc path, prod path, consistency path)."""
+    import numpy as np
+
+    qc, prod, consistency = synthetic_sources(rows, seed)
+    paths = [os.path.join(workdir, name) for name in ('qc.csv', 'prod.csv', 'consistency.npy')]
+    qc.to_csv(paths[0], index=False)
+    prod.to_csv(paths[1], index=False)
+    # In roster order, so a run does not need the Name -> value mapping
+    np.save(paths[2], prod['Name'].astype(str).map(consistency).to_numpy(dtype=np.float32))
+    return paths
+
+
+def load(kind, qc_path, prod_path, consistency_path):
+    """Loaded QC and Production rosters as widened DataFrames or Rosters."""
+    import numpy as np
+
+    from ingest import load_prod, load_qc, widen_floats
+    from roster import Roster
+
+    convert = widen_floats if kind == 'frame' else Roster.from_frame
+    qc_data = convert(load_qc(qc_path))
+    prod_data = load_prod(prod_path)
+    prod_data['Consistency'] = np.load(consistency_path)
+    return qc_data, convert(prod_data)
+
+
+def held_bytes(roster):
+    if hasattr(roster, 'nbytes'):
+        return roster.nbytes
+    return int(roster.memory_usage(index=True, deep=True).sum())
+
+
+def run_case(kind, rows, paths, build):
+    """Load, score and optionally build one roster size; runs in its own process."""
+    from builder import build_workbook
+    from scoring import score
+
+    result = {'kind': kind, 'rows': rows, 'seconds': {}}
+    seconds = result['seconds']
+    result['base_rss_bytes'] = peak_rss_bytes()
+
+    start = time.perf_counter()
+    qc_data, prod_data = load(kind, *paths)
+    seconds['load'] = time.perf_counter() - start
+    result['qc_bytes_per_employee'] = held_bytes(qc_data) / rows
+    result['prod_bytes_per_employee'] = held_bytes(prod_data) / rows
+
+    start = time.perf_counter()
+    for df in (qc_data, prod_data):
+        score(df)
+    seconds['score'] = time.perf_counter() - start
+
+    if build:
+        with tempfile.TemporaryDirectory() as workdir:
+            start = time.perf_counter()
+            build_workbook(os.path.join(workdir, 'evaluation.xlsx'), qc_data, prod_data,
+                           streaming_write=True, verbose=False)
+            seconds['build'] = time.perf_counter() - start
+    result['peak_rss_bytes'] = peak_rss_bytes()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare roster memory per employee.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000],
+                        help="employees per roster (QC and Production each)")
+    parser.add_argument('--build', action='store_true', help="also build the workbook (streaming write)")
+    parser.add_argument('--max-rss-mb', type=float, help="fail when a roster run's peak RSS exceeds this")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9}  {'kind':<7} {'QC B/emp':>9} {'Prod B/emp':>11} {'load':>8} {'score':>8} "
+          f"{'build':>8} {'peak RSS':>10} {'rise':>10}")
+    over_cap = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as workdir:
+            paths = write_sources(workdir, rows)
+            for kind in KINDS:
+                # A fresh process per run keeps peak RSS per run
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                    result = pool.submit(run_case, kind, rows, paths, args.build).result()
+                seconds = result['seconds']
+                build = f"{seconds['build']:7.2f}s" if 'build' in seconds else f"{'-':>8}"
+                peak_mb = result['peak_rss_bytes'] / 2**20
+                rise_mb = (result['peak_rss_bytes'] - result['base_rss_bytes']) / 2**20
+                print(f"{rows:>9,}  {kind:<7} {result['qc_bytes_per_employee']:9.1f} "
+                      f"{result['prod_bytes_per_employee']:11.1f} {seconds['load']:7.2f}s "
+                      f"{seconds['score']:7.2f}s {build} {peak_mb:8.1f}MB {rise_mb:8.1f}MB")
+                if kind == 'roster' and args.max_rss_mb and peak_mb > args.max_rss_mb:
+                    over_cap.append((rows, peak_mb))
+
+    for rows, peak_mb in over_cap:
+        print(f"✗ {rows:,} rows: peak RSS {peak_mb:.1f}MB is over the {args.max_rss_mb:g}MB cap")
+    if args.max_rss_mb and not over_cap:
+        print(f"✓ Every roster run stayed under {args.max_rss_mb:g}MB")
+    if over_cap:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
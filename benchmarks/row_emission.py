@@ -0,0 +1,100 @@
+"""
+================================================================================
+BENCHMARK - DATA ROW EMISSION (iterrows + ws.cell vs. bulk rows)
+================================================================================
+
+Compares the original per-cell data loop (pandas iterrows, ~12 ws.cell calls
+per row and a fresh Alignment per cell) against the bulk path used by
+Excel_Maker.py (column lists + whole-row append with pre-resolved styles).
+Only row emission is timed; saving is excluded.
+
+Usage:
+    python benchmarks/row_emission.py --rows 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.styles import Alignment
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sheet_writer import border, center, data_row_cells, data_row_styles, result_fill, result_font  # noqa: E402
+
+COLUMNS = ['Name', 'TotalWorkHrs', 'LeaveH', 'DistinctTasks', 'ProjectsWorked', 'TotalTasks', 'TLScore']
+
+
+def synthetic_qc(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Name': [f"Employee{i}" for i in range(n)],
+        'TotalWorkHrs': rng.uniform(600, 1100, n).round(1),
+        'LeaveH': rng.uniform(0, 150, n).round(1),
+        'DistinctTasks': rng.integers(5, 20, n),
+        'ProjectsWorked': rng.integers(15, 40, n),
+        'TotalTasks': rng.integers(80, 200, n),
+        'TLScore': rng.integers(10, 21, n),
+    })
+
+
+def formulas(r, end_row):
+    score = f'=20*((B{r}-MIN(B$9:B${end_row}))/(MAX(B$9:B${end_row})-MIN(B$9:B${end_row})+0.0001))'
+    return score, f'=RANK(H{r},H$9:H${end_row},0)'
+
+
+def emit_iterrows(df):
+    ws = Workbook().active
+    end_row = 9 + len(df) - 1
+    for idx, row in df.iterrows():
+        r = idx + 9
+        for col, name in enumerate(COLUMNS, start=1):
+            ws.cell(row=r, column=col).value = row[name]
+        score, rank = formulas(r, end_row)
+        ws.cell(row=r, column=8).value = score
+        ws.cell(row=r, column=8).number_format = '0.00'
+        ws.cell(row=r, column=8).fill = result_fill
+        ws.cell(row=r, column=8).font = result_font
+        ws.cell(row=r, column=8).border = border
+        ws.cell(row=r, column=9).value = rank
+        ws.cell(row=r, column=9).fill = result_fill
+        ws.cell(row=r, column=9).font = result_font
+        ws.cell(row=r, column=9).alignment = center
+        ws.cell(row=r, column=9).border = border
+        for col in range(1, 8):
+            ws.cell(row=r, column=col).border = border
+            ws.cell(row=r, column=col).alignment = Alignment(horizontal="center" if col > 1 else "left")
+
+
+def emit_bulk(df):
+    ws = Workbook().active
+    ws.cell(row=8, column=1).value = "header"
+    end_row = 9 + len(df) - 1
+    styles = data_row_styles(ws)
+    for r, values in enumerate(zip(*(df[col].tolist() for col in COLUMNS)), start=9):
+        score, rank = formulas(r, end_row)
+        ws.append(data_row_cells(ws, styles, values, score, rank))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time data-row emission.")
+    parser.add_argument('--rows', type=int, default=50_000)
+    args = parser.parse_args()
+
+    df = synthetic_qc(args.rows)
+    results = {}
+    for label, emit in (('iterrows + ws.cell', emit_iterrows), ('bulk rows', emit_bulk)):
+        start = time.perf_counter()
+        emit(df)
+        elapsed = time.perf_counter() - start
+        results[label] = args.rows / elapsed
+        print(f"{label:<20} {elapsed:8.2f} s  {results[label]:>10,.0f} rows/s")
+    print(f"speed-up: {results['bulk rows'] / results['iterrows + ws.cell']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+================================================================================
+BENCHMARK - PER-CELL STYLE OBJECTS vs. THE NAMED-STYLE REGISTRY
+================================================================================
+
+Builds a QC-shaped data block two ways and reports build time, `wb.save`
+time, the size of xl/styles.xml and the size of the saved file:
+
+    per-cell      font / fill / border set cell by cell, a fresh Alignment
+                  per cell (the original data loop)
+    named styles  the palette registered once per workbook, rows emitted
+                  with style arrays resolved from it (sheet_writer.py)
+
+openpyxl interns identical style objects when a cell is assigned, so both
+ways end up with the same handful of cellXfs; styles.xml stays a few KB
+whatever the headcount. The difference is the work done per cell while
+building and the memory held until save.
+
+Usage:
+    python benchmarks/style_registry.py --rows 10000 100000
+    python benchmarks/style_registry.py --rows 1000000 --write-only
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from row_emission import COLUMNS, formulas, synthetic_qc  # noqa: E402
+from sheet_writer import (border, center, data_row_cells, data_row_styles,  # noqa: E402
+                          result_fill, result_font)
+
+
+def _per_cell_row(ws, write_only, r, values, score, rank):
+    """One data row with every style attribute set on the cell itself."""
+    make = (lambda col, value: WriteOnlyCell(ws, value=value)) if write_only else \
+        (lambda col, value: ws.cell(row=r, column=col, value=value))
+    cells = []
+    for col, value in enumerate(values, start=1):
+        cell = make(col, value)
+        cell.border = border
+        cell.alignment = Alignment(horizontal="center" if col > 1 else "left")
+        cells.append(cell)
+    cell = make(len(values) + 1, score)
+    cell.number_format = '0.00'
+    cell.fill = result_fill
+    cell.font = result_font
+    cell.border = border
+    cells.append(cell)
+    cell = make(len(values) + 2, rank)
+    cell.fill = result_fill
+    cell.font = result_font
+    cell.alignment = center
+    cell.border = border
+    cells.append(cell)
+    return cells
+
+
+def build_per_cell(df, write_only):
+    wb = Workbook(write_only=write_only)
+    ws = wb.create_sheet("QC") if write_only else wb.active
+    end_row = 9 + len(df) - 1
+    for r, values in enumerate(zip(*(df[col].tolist() for col in COLUMNS)), start=9):
+        cells = _per_cell_row(ws, write_only, r, values, *formulas(r, end_row))
+        if write_only:
+            ws.append(cells)
+    return wb
+
+
+def build_named_styles(df, write_only):
+    wb = Workbook(write_only=write_only)
+    ws = wb.create_sheet("QC") if write_only else wb.active
+    if not write_only:
+        ws.cell(row=8, column=1).value = "header"
+    end_row = 9 + len(df) - 1
+    styles = data_row_styles(ws)
+    for r, values in enumerate(zip(*(df[col].tolist() for col in COLUMNS)), start=9):
+        ws.append(data_row_cells(ws, styles, values, *formulas(r, end_row)))
+    return wb
+
+
+def measure(build, df, write_only, path):
+    """Return (build s, save s, styles.xml bytes, file bytes)."""
+    start = time.perf_counter()
+    wb = build(df, write_only)
+    built = time.perf_counter()
+    wb.save(path)
+    saved = time.perf_counter()
+    with zipfile.ZipFile(path) as zf:
+        styles_size = zf.getinfo('xl/styles.xml').file_size
+    return built - start, saved - built, styles_size, os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time per-cell styles against the named-style registry.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--write-only', action='store_true',
+                        help="build write-only workbooks (what STREAMING_WRITE uses; needed for 1M rows)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9}  {'styles':<13} {'build':>8} {'save':>8} {'styles.xml':>11} {'file':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            df = synthetic_qc(rows)
+            results = {}
+            for label, build in (('per-cell', build_per_cell), ('named styles', build_named_styles)):
+                path = os.path.join(tmp, f"{label.replace(' ', '_')}_{rows}.xlsx")
+                results[label] = measure(build, df, args.write_only, path)
+                os.remove(path)
+                build_s, save_s, styles_size, file_size = results[label]
+                print(f"{rows:>9,}  {label:<13} {build_s:7.2f}s {save_s:7.2f}s "
+                      f"{styles_size / 1024:9.1f}KB {file_size / 2**20:8.1f}MB")
+            before, after = results['per-cell'], results['named styles']
+            print(f"{'':>9}  build + save speed-up: {sum(before[:2]) / sum(after[:2]):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
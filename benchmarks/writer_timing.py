@@ -0,0 +1,69 @@
+"""
+================================================================================
+BENCHMARK - WRITER BACKENDS: WRITE TIME
+================================================================================
+
+Builds the evaluation workbook from the same synthetic rosters with every
+writer backend (see writers.py) and reports populate + save time and file
+size per backend, alongside the time to export the scores to Parquet.
+That the backends write the same workbook is checked cell by cell by
+tests/test_writers.py.
+
+Usage:
+    python benchmarks/writer_timing.py
+    python benchmarks/writer_timing.py --rows 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from generation import derive, synthetic_sources  # noqa: E402
+
+REFERENCE = 'openpyxl'
+
+
+def build(path, rosters, writer, **options):
+    """Populate and save one workbook; returns the seconds taken."""
+    from builder import populate_workbook, save_workbook
+
+    start = time.perf_counter()
+    out, cached = populate_workbook(rosters, verbose=False, writer=writer, **options)
+    save_workbook(out, path, cached)
+    return time.perf_counter() - start
+
+
+def main():
+    from schema import PROD_TEAM, QC_TEAM
+    from writers import WRITERS, export_scores
+
+    parser = argparse.ArgumentParser(description="Time the writer backends.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000],
+                        help="employees per roster")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9}  {'writer':<22} {'seconds':>8} {'MB':>7}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.rows:
+            qc_data, prod_data = derive(*synthetic_sources(rows))
+            rosters = [(QC_TEAM, qc_data), (PROD_TEAM, prod_data)]
+            path = os.path.join(workdir, 'timed.xlsx')
+            runs = [(REFERENCE, REFERENCE, {}), (f'{REFERENCE} streaming', REFERENCE, {'streaming_write': True})]
+            runs += [(writer, writer, {}) for writer in WRITERS if writer != REFERENCE]
+            for name, writer, options in runs:
+                seconds = build(path, rosters, writer, **options)
+                print(f"{rows:>9,}  {name:<22} {seconds:7.2f}s {os.path.getsize(path) / 2**20:7.1f}")
+
+            scores = os.path.join(workdir, 'scores.parquet')
+            start = time.perf_counter()
+            export_scores(scores, rosters)
+            print(f"{rows:>9,}  {'score export (parquet)':<22} {time.perf_counter() - start:7.2f}s "
+                  f"{os.path.getsize(scores) / 2**20:7.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+"""
+================================================================================
+WORKBOOK BUILDER - EVALUATION SHEETS FROM ROSTER DATAFRAMES
+================================================================================
+
+Lays out one evaluation sheet per team, plus the instructions sheet, and saves
+the workbook. Sheets are generated from the team declarations in schema.py:
+headers, weight cells, column widths and formulas all follow from the metric
+list, so the QC and Production Hand sheets share one code path. Excel_Maker.py
+builds its single output file with it; shards.py calls it once per
+department from worker processes.
+
+Usage:
+    build_workbook("Performance_Evaluation_Customizable.xlsx", qc_data, prod_data,
+                   hoist_column_stats=True)
+"""
+
+import os
+
+from openpyxl.utils import column_index_from_string
+from openpyxl.worksheet.formula import ArrayFormula
+
+from profiling import NULL_PROFILER
+from schema import FIRST_DATA_ROW, PROD_TEAM, QC_TEAM, compile_formulas, layout
+from scoring import column_stats, score
+from sheet_writer import (TITLE, NOTE, SECTION, HEADER, WEIGHT, TOTAL, STATUS, THRESHOLD_LABEL,
+                          GUIDE_TITLE, GUIDE_SUBTITLE, GUIDE_SECTION)
+from writers import open_writer
+
+QC_SHEET = QC_TEAM.sheet
+PROD_SHEET = PROD_TEAM.sheet
+INSTRUCTIONS_SHEET = "📖_Instructions"
+
+# Data rows converted to Python values at a time, so that the row loop holds
+# one chunk of values rather than every column of the roster
+ROW_CHUNK = 10_000
+
+
+def _quiet(*args, **kwargs):
+    pass
+
+
+def iter_rows(df, columns, chunk=ROW_CHUNK):
+    """Yield the values of `columns` row by row, slicing `chunk` rows at a time."""
+    for start in range(0, len(df), chunk):
+        part = df.iloc[start:start + chunk]
+        yield from zip(*(part[col].tolist() for col in columns))
+
+
+def precomputed_values(df, team, leave_threshold, hoist_column_stats=False):
+    """Python-computed results for a sheet's formula cells, keyed by coordinate."""
+    lay = layout(team)
+    weights = team.weights
+    total = sum(weights)
+    values = {
+        f'{lay.total}6': total,
+        f'{lay.status}6': "✓ VALID" if total == 100 else "✗ MUST BE 100%",
+    }
+    if hoist_column_stats:
+        for metric, stat_col in zip(team.metrics, lay.stats):
+            lo, hi, span = column_stats(df[metric.column], metric, leave_threshold)
+            values[f'{stat_col}5'] = lo
+            values[f'{stat_col}6'] = hi
+            values[f'{stat_col}7'] = span
+
+    result = score(df, weights, leave_threshold, team.metrics)
+    for r, (final, rank) in enumerate(zip(result['FinalScore'], result['Rank']), start=FIRST_DATA_ROW):
+        values[f'{lay.score}{r}'] = final
+        values[f'{lay.rank}{r}'] = rank
+    return values
+
+
+# ============================================================================
+# TEAM SHEET
+# ============================================================================
+
+def team_sheet(writer, team, df, hoist_column_stats=False, precompute_values=False,
+               sorted_rank_helper=False, log=print, profiler=NULL_PROFILER):
+    """
+    Add `team`'s evaluation sheet for the roster `df` through `writer` (see
+    writers.py). Returns the precomputed cell values when
+    `precompute_values` is set, otherwise None. The data-row loop and the
+    precomputation are spans of `profiler`.
+    """
+    lay = layout(team)
+    ws = writer.sheet(team.sheet)
+    log(f"Creating {team.name} sheet...")
+
+    # Title
+    ws.merge(f'A1:{lay.last}1')
+    ws.cell('A1', team.title, TITLE)
+
+    # Instructions
+    ws.merge(f'A2:{lay.last}2')
+    ws.cell('A2', "📝 EDIT YELLOW CELLS (Row 6) to adjust weights. Total must equal 100%", NOTE)
+
+    # Weight Labels Row
+    ws.merge(f'A4:{lay.last}4')
+    ws.cell('A4', "⚙️ ADJUSTABLE WEIGHTS (Change these values)", SECTION)
+
+    # Weight Headers
+    weight_headers = [metric.weight_header for metric in team.metrics] + ['TOTAL %', 'Status']
+    for col, header in zip(lay.weights + (lay.total, lay.status), weight_headers):
+        ws.cell(f'{col}5', header, HEADER)
+
+    # Default Weight Values
+    for col, weight in zip(lay.weights, team.weights):
+        ws.cell(f'{col}6', weight, WEIGHT)
+
+    # Total Weight Formula
+    ws.cell(f'{lay.total}6', f'=SUM(A6:{lay.weights[-1]}6)', TOTAL)
+
+    # Status Check
+    ws.cell(f'{lay.status}6', f'=IF({lay.total}6=100,"✓ VALID","✗ MUST BE 100%")', STATUS)
+
+    # Leave Threshold
+    ws.cell(f'{lay.threshold_label}5', "Leave Threshold:", THRESHOLD_LABEL)
+    ws.cell(f'{lay.threshold}5', team.leave_threshold, WEIGHT)
+
+    # Data Headers
+    data_headers = ['Name'] + [metric.header for metric in team.metrics] + ['FINAL SCORE (/20)', 'RANK']
+    for col, header in zip(('A',) + lay.data + (lay.score, lay.rank), data_headers):
+        ws.cell(f'{col}8', header, HEADER)
+
+    formulas = compile_formulas(team, len(df), hoist_column_stats, sorted_rank_helper)
+
+    # Hidden statistics block: MIN / MAX / SPAN labels, one column per metric
+    if hoist_column_stats:
+        for row, text in zip((5, 6, 7), ("MIN", "MAX", "SPAN")):
+            ws.cell(f'{lay.stats_label}{row}', text)
+        for coord, formula in formulas.stats:
+            ws.cell(coord, formula)
+        for col in (lay.stats_label,) + lay.stats:
+            ws.column(col, hidden=True)
+
+    # Hidden rank helpers: scores sorted descending (one SORT array formula)
+    # and the rank of each tie group (position of its first score)
+    if sorted_rank_helper:
+        ws.cell(f'{lay.sorted_scores}8', "SORTED SCORES")
+        ws.cell(f'{lay.group_rank}8', "GROUP RANK")
+        ws.column(lay.sorted_scores, hidden=True)
+        ws.column(lay.group_rank, hidden=True)
+
+    # Column widths
+    ws.column('A', 22)
+    for col in lay.data:
+        ws.column(col, team.metric_width)
+    ws.column(lay.score, 18)
+    ws.column(lay.rank, 10)
+    ws.column(lay.threshold_label, 16)
+    ws.column(lay.threshold, 10)
+    ws.column(lay.last, 5)
+
+    # Results are computed before the rows so that writers storing them with
+    # each cell (xlsxwriter) have them at hand
+    cached = None
+    if precompute_values:
+        with profiler.span(f"precompute:{team.sheet}", rows=len(df), hot=True):
+            cached = precomputed_values(df, team, team.leave_threshold, hoist_column_stats)
+
+    # The header region is flushed, then rows are emitted whole from column
+    # slices of ROW_CHUNK rows, with styles resolved once and formulas filled
+    # into the compiled templates
+    ws.start_rows(cached)
+    with profiler.span(f"rows:{team.sheet}", rows=len(df), hot=True):
+        score_formula, rank_formula = formulas.score, formulas.rank
+        helper_padding = [None] * (column_index_from_string(lay.sorted_scores) - 1 - len(data_headers))
+        columns = ['Name'] + team.columns
+        extra = None
+        for r, values in enumerate(iter_rows(df, columns), start=FIRST_DATA_ROW):
+            if sorted_rank_helper:
+                if r == FIRST_DATA_ROW:
+                    extra = helper_padding + [ArrayFormula(formulas.sort_range, formulas.sort), 1]
+                else:
+                    extra = helper_padding + [None, formulas.group_rank.format(r=r, p=r - 1)]
+            ws.data_row(r, values, score_formula(r), rank_formula(r), extra)
+    ws.finish()
+
+    log(f"✓ {team.name} sheet completed")
+    return cached
+
+
+# ============================================================================
+# INSTRUCTIONS SHEET
+# ============================================================================
+
+def instruction_rows(teams):
+    """User guide lines for a workbook holding `teams`; team-specific parts come from the schema."""
+    thresholds = " or ".join(f"{t:g}" for t in sorted({team.leave_threshold for team in teams}))
+    threshold_cells = " or ".join(f"{layout(team).threshold}5 ({team.short})" for team in teams)
+    default_weights = []
+    for team in teams:
+        default_weights.append(f"{team.name}:")
+        default_weights.extend(f"   {metric.label}: {metric.weight:g}%" for metric in team.metrics)
+        default_weights.append("")
+
+    lines = [
+        "EMPLOYEE PERFORMANCE EVALUATION SYSTEM",
+        "Customizable Excel Template - User Guide",
+        "",
+        "🎯 HOW TO USE THIS TEMPLATE",
+        "",
+        "Step 1: Choose Your Team",
+        *(f"   • Go to '{team.sheet}' sheet for {team.staff}" for team in teams),
+        "",
+        "Step 2: Adjust Weights (YELLOW CELLS in Row 6)",
+        "   • Click on any yellow cell in Row 6",
+        "   • Type your desired weight percentage (e.g., 60 for 60%)",
+        "   • Ensure TOTAL equals 100% (check Status column)",
+        "   • Scores update AUTOMATICALLY!",
+        "",
+        "Step 3: Optional - Adjust Leave Threshold",
+        f"   • Default is {thresholds} hours",
+        f"   • Change value in cell {threshold_cells}",
+        "",
+        "Step 4: Review Results",
+        "   • Final scores shown in green column",
+        "   • Rankings update automatically",
+        "",
+        "",
+        "📊 UNDERSTANDING THE SCORING",
+        "",
+        "Min-Max Normalization:",
+        "   All metrics normalized to 0-1 scale",
+        "   Best performer = 1.0, Worst = 0.0",
+        "   Formula: (Value - Min) / (Max - Min)",
+        "",
+        "Leave Penalty (Threshold-based):",
+        "   • Below threshold: NO penalty",
+        "   • Above threshold: Progressive penalty",
+        "   • Higher excess = Lower score",
+        "",
+        "Weighted Scoring:",
+        "   Final Score = 20 × Σ(Normalized Metric × Weight)",
+        "",
+        "",
+        "⚙️ DEFAULT WEIGHTS",
+        "",
+        *default_weights,
+        "",
+        "💡 TIPS FOR EFFECTIVE USE",
+        "",
+        "• Experiment with different weight combinations",
+        "• Compare scenarios side-by-side",
+        "• Use for 'what-if' analysis",
+        "• Save different versions for different priorities",
+        "• Review rankings after each weight change",
+        "",
+        "",
+        "📝 NOTES",
+        "",
+        "• Formulas are protected but weights are editable",
+        "• All calculations happen in real-time",
+        "• Data source: Manual entry from KDxx Operator Analysis 1.xlsx",
+        "• Consistency scores are approximate",
+    ]
+    return [[line, "", ""] for line in lines]
+
+
+def instructions_sheet(writer, teams, log=print):
+    """Add the user guide as the first sheet through `writer`."""
+    ws_inst = writer.sheet(INSTRUCTIONS_SHEET, 0)
+    log("Creating instructions sheet...")
+
+    for row_idx, row_data in enumerate(instruction_rows(teams), start=1):
+        for col, value in zip('ABC', row_data):
+            style = None
+            if row_idx == 1:
+                style = GUIDE_TITLE
+            elif row_idx == 2:
+                style = GUIDE_SUBTITLE
+            elif any(emoji in str(value) for emoji in ["🎯", "📊", "⚙️", "💡", "📝"]):
+                style = GUIDE_SECTION
+            ws_inst.cell(f'{col}{row_idx}', value, style)
+
+    ws_inst.merge('A1:C1')
+    ws_inst.merge('A2:C2')
+    ws_inst.column('A', 60)
+    ws_inst.column('B', 25)
+    ws_inst.column('C', 20)
+    ws_inst.finish()
+
+    log("✓ Instructions sheet completed")
+
+
+# ============================================================================
+# WORKBOOK
+# ============================================================================
+
+def populate_workbook(rosters, hoist_column_stats=False, streaming_write=False,
+                      precompute_values=False, sorted_rank_helper=False, verbose=True,
+                      profiler=NULL_PROFILER, writer='openpyxl'):
+    """
+    Lay out one sheet per (team, roster) pair in `rosters`, plus the
+    instructions sheet, without saving. Rosters that are None or empty get
+    no sheet. Returns (writer, cached values per sheet, or None); pass both
+    to save_workbook.
+
+    `writer` picks the backend (see writers.py): 'openpyxl', the reference,
+    or 'xlsxwriter'. A write-only openpyxl workbook, and xlsxwriter always,
+    hold their rows in temporary files until saved. Each sheet is a span of
+    `profiler` (see profiling.py).
+    """
+    log = print if verbose else _quiet
+    options = dict(hoist_column_stats=hoist_column_stats, precompute_values=precompute_values,
+                   sorted_rank_helper=sorted_rank_helper, log=log, profiler=profiler)
+    rosters = [(team, df) for team, df in rosters if df is not None and len(df)]
+
+    log("Creating Excel workbook with formulas...")
+    out = open_writer(writer, [INSTRUCTIONS_SHEET] + [team.sheet for team, _ in rosters],
+                      streaming_write)
+
+    cached = {}
+    for team, df in rosters:
+        with profiler.span(f"sheet:{team.sheet}", rows=len(df)):
+            cached[team.sheet] = team_sheet(out, team, df, **options)
+    with profiler.span("sheet:instructions"):
+        instructions_sheet(out, [team for team, _ in rosters], log)
+    return out, (cached if precompute_values else None)
+
+
+def save_workbook(writer, output_file, cached=None, profiler=NULL_PROFILER):
+    """Save a populated workbook, storing precomputed values when given."""
+    with profiler.span("save") as span:
+        writer.save(output_file, cached, profiler)
+        span.attrs['output_bytes'] = os.path.getsize(output_file)
+    return output_file
+
+
+def build_team_workbook(output_file, rosters, hoist_column_stats=False, streaming_write=False,
+                        precompute_values=False, sorted_rank_helper=False, verbose=True,
+                        profiler=NULL_PROFILER, writer='openpyxl'):
+    """
+    Build and save a workbook with one sheet per (team, roster) pair in
+    `rosters`. Rosters that are None or empty get no sheet. The options
+    match the generator options at the top of Excel_Maker.py; `profiler`
+    receives a span per stage.
+    """
+    out, cached = populate_workbook(rosters, hoist_column_stats, streaming_write,
+                                    precompute_values, sorted_rank_helper, verbose, profiler, writer)
+    return save_workbook(out, output_file, cached, profiler)
+
+
+def build_workbook(output_file, qc_data, prod_data, **options):
+    """Build and save the evaluation workbook for one QC and one Production roster."""
+    return build_team_workbook(output_file, [(QC_TEAM, qc_data), (PROD_TEAM, prod_data)], **options)
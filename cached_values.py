@@ -0,0 +1,169 @@
+"""
+================================================================================
+CACHED FORMULA VALUES - POST-PROCESS A SAVED WORKBOOK
+================================================================================
+
+openpyxl saves formula cells with an empty <v/> element, so spreadsheet apps
+must recalculate on open and headless readers (pandas, openpyxl with
+data_only=True) see None. embed_cached_values() rewrites the saved file so
+selected formula cells carry precomputed results while keeping the formula.
+
+The sheet-XML readers shared with incremental.py and collect.py live here
+too: sheet_parts, row_pieces, read_shared_strings and cell_value, as does
+replacing(), which both rewriters use to swap the new file in.
+"""
+
+import codecs
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from xml.sax.saxutils import escape, unescape
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# A formula cell exactly as openpyxl writes it: <c r="H9" s="7"><f>...</f><v /></c>
+FORMULA_CELL = re.compile(r'<c r="([A-Z]+[0-9]+)"([^>]*)><f>(.*?)</f><v\s*/>')
+
+CHUNK_SIZE = 1 << 20
+
+# The text runs of a shared or inline string
+TEXT = re.compile(r'<t\b[^>]*>([^<]*)</t>')
+# The stored value of a cell
+VALUE = re.compile(r'<v>([^<]*)</v>')
+
+
+def sheet_parts(archive):
+    """Map sheet titles to their XML part names inside the archive."""
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{{{NS_PKG_REL}}}Relationship")}
+
+    parts = {}
+    for sheet in workbook.iter(f"{{{NS_MAIN}}}sheet"):
+        target = targets[sheet.get(f"{{{NS_REL}}}id")]
+        parts[sheet.get("name")] = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+    return parts
+
+
+def row_pieces(src):
+    """Decode a sheet part in chunks that end on a row boundary."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    while True:
+        chunk = src.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        pending += decoder.decode(chunk)
+        cut = pending.rfind("</row>")
+        if cut == -1:
+            continue
+        cut += len("</row>")
+        yield pending[:cut]
+        pending = pending[cut:]
+    yield pending
+
+
+def read_shared_strings(archive):
+    """The shared string table of a workbook archive, as a list."""
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    xml = archive.read("xl/sharedStrings.xml").decode("utf-8")
+    xml = re.sub(r'<rPh\b.*?</rPh>', '', xml, flags=re.S)
+    return [unescape(''.join(TEXT.findall(item)))
+            for item in re.findall(r'<si>(.*?)</si>', xml, flags=re.S)]
+
+
+def cell_value(attrs, value, inline, strings):
+    """
+    The Python value of a cell from its attributes, <v> text and inline
+    string XML; `strings` returns the shared string table when needed.
+    """
+    if 't="' not in attrs or 't="n"' in attrs:
+        return float(value) if value else None
+    if 't="inlineStr"' in attrs:
+        return unescape(''.join(TEXT.findall(inline)))
+    if 't="s"' in attrs:
+        return strings()[int(value)]
+    if 't="b"' in attrs:
+        return value == '1'
+    return unescape(value)
+
+
+def _format_value(value):
+    """Return (type attribute, <v> text) for a cached value."""
+    if isinstance(value, str):
+        return ' t="str"', escape(value)
+    if isinstance(value, bool):
+        return ' t="b"', str(int(value))
+    return "", repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def _rewrite_sheet(src, dst, values):
+    """Stream one sheet part, filling <v/> for every coordinate in `values`."""
+    def fill(match):
+        coord, attrs, formula = match.groups()
+        if coord not in values:
+            return match.group(0)
+        type_attr, text = _format_value(values[coord])
+        return f'<c r="{coord}"{attrs}{type_attr}><f>{formula}</f><v>{text}</v>'
+
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    while True:
+        chunk = src.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        pending += decoder.decode(chunk)
+        # Only rewrite up to the last complete cell; carry the rest over
+        cut = pending.rfind("</c>")
+        if cut == -1:
+            continue
+        cut += len("</c>")
+        dst.write(FORMULA_CELL.sub(fill, pending[:cut]).encode("utf-8"))
+        pending = pending[cut:]
+    dst.write(FORMULA_CELL.sub(fill, pending).encode("utf-8"))
+
+
+@contextmanager
+def replacing(path):
+    """
+    A temporary file next to `path` to write a new version of it to. It
+    replaces `path`, keeping its file mode, when the block succeeds, and is
+    removed when the block raises.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=directory)
+    os.close(fd)
+    try:
+        yield tmp_path
+        # mkstemp creates the file as 0600; keep the workbook's own mode
+        shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def embed_cached_values(path, values_by_sheet):
+    """
+    Write cached results into formula cells of the workbook at `path`.
+
+    `values_by_sheet` maps a sheet title to {coordinate: value}. Formulas are
+    left untouched; only the cached <v> element of each listed cell is filled.
+    """
+    with replacing(path) as tmp_path, zipfile.ZipFile(path) as src_zip, \
+            zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as dst_zip:
+        parts = sheet_parts(src_zip)
+        targets = {parts[title]: values for title, values in values_by_sheet.items()}
+        for info in src_zip.infolist():
+            with src_zip.open(info) as src, dst_zip.open(info, "w") as dst:
+                if info.filename in targets:
+                    _rewrite_sheet(src, dst, targets[info.filename])
+                else:
+                    shutil.copyfileobj(src, dst)
@@ -0,0 +1,295 @@
+"""
+================================================================================
+SCORE COLLECTION - WEIGHTS, THRESHOLDS AND SCORES FROM MANY WORKBOOKS
+================================================================================
+
+Walks a directory of generated evaluation workbooks and gathers every team
+sheet into one DataFrame: one row per employee with the file, team, Name,
+FINAL SCORE and RANK, plus the sheet's leave threshold (K5 / M5) and the
+weights in row 6.
+
+Workbooks are never loaded. Each file is opened as a zip archive and only
+the team sheet parts are streamed, a chunk of rows at a time; the regex pass
+picks out the weight and threshold cells and the Name, metric, FINAL SCORE
+and RANK columns of the data block, and skips everything else. Files are
+spread over a process pool.
+
+FINAL SCORE and RANK are formulas. A workbook saved by Excel, or generated
+with PRECOMPUTE_VALUES, carries their results; a plain openpyxl save does
+not. For sheets without cached results, scores are recomputed with
+scoring.score from the sheet's own data, weights and threshold, which gives
+what Excel would show. The ScoreSource column says which applied.
+
+Usage:
+    python collect.py shards/ -o scores.parquet
+    python collect.py archive/2026/ --pattern "*.xlsx" --processes 8 -o scores.csv
+"""
+
+import argparse
+import fnmatch
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from cached_values import VALUE, cell_value, read_shared_strings, row_pieces, sheet_parts
+from schema import FIRST_DATA_ROW, TEAMS, Team, layout
+from scoring import final_scores, rank_descending
+
+THRESHOLD_ROW = 5
+WEIGHT_ROW = 6
+
+# Any cell of `columns`, plain or formula: (column, row, attributes, content)
+SHEET_CELL = r'<c r="({columns})([0-9]+)"([^>]*?)(?:/>|>(.*?)</c>)'
+
+CACHED = 'cached'
+COMPUTED = 'computed'
+
+
+def find_workbooks(root, pattern="*.xlsx"):
+    """Every file under `root` matching `pattern`, in a stable order."""
+    paths = []
+    for directory, dirs, files in os.walk(root):
+        dirs.sort()
+        paths.extend(os.path.join(directory, name) for name in sorted(files)
+                     if fnmatch.fnmatch(name, pattern) and not name.startswith('~$'))
+    return paths
+
+
+def _number(value):
+    if isinstance(value, bool) or value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan  # error values such as #DIV/0!
+
+
+@dataclass(frozen=True)
+class SheetScores:
+    """The weights, threshold and scores read from one team sheet."""
+    team: Team
+    weights: tuple       # row 6, in metric order (NaN when blank)
+    threshold: float     # leave threshold (NaN when blank)
+    names: list
+    scores: np.ndarray   # FINAL SCORE per employee
+    ranks: np.ndarray
+    source: str          # CACHED or COMPUTED
+
+
+def read_team_sheet(archive, part, team, strings):
+    """
+    Stream one team sheet part and return (weights, threshold, names,
+    values), where values is a float array with one row per employee: the
+    metric columns, then FINAL SCORE and RANK (NaN where a formula has no
+    cached result).
+    """
+    lay = layout(team)
+    data_index = {letter: i for i, letter in enumerate(('A',) + lay.data + (lay.score, lay.rank))}
+    weight_index = {letter: i for i, letter in enumerate(lay.weights)}
+    letters = set(data_index) | set(weight_index) | {lay.threshold}
+    # Longest letters first, so AB is not read as A
+    pattern = '|'.join(sorted(letters, key=lambda letter: (-len(letter), letter)))
+    sheet_cell = re.compile(SHEET_CELL.format(columns=pattern), re.S)
+
+    weights = [np.nan] * len(lay.weights)
+    threshold = np.nan
+    header = None
+    rows = {}
+    with archive.open(part) as src:
+        for piece in row_pieces(src):
+            for col, row, attrs, content in sheet_cell.findall(piece):
+                r = int(row)
+                cached = VALUE.search(content) if content else None
+                if cached and not cached.group(1):
+                    cached = None  # formula written without a result (xlsxwriter's <v></v>)
+                inline = content if content and '<is>' in content else ''
+                if not (cached or inline):
+                    continue
+                if cached and 't="' not in attrs:
+                    value = float(cached.group(1))  # the common case: a plain number
+                else:
+                    value = cell_value(attrs, cached.group(1) if cached else '', inline, strings)
+                if r >= FIRST_DATA_ROW and col in data_index:
+                    values = rows.get(r)
+                    if values is None:
+                        values = rows[r] = [None] + [np.nan] * (len(data_index) - 1)
+                    values[data_index[col]] = value if col == 'A' or type(value) is float else _number(value)
+                elif r == FIRST_DATA_ROW - 1 and col == 'A':
+                    header = value
+                elif r == WEIGHT_ROW and col in weight_index:
+                    weights[weight_index[col]] = _number(value)
+                elif r == THRESHOLD_ROW and col == lay.threshold:
+                    threshold = _number(value)
+
+    if header != 'Name':
+        raise ValueError(f"sheet {team.sheet!r} has no data header in row {FIRST_DATA_ROW - 1}")
+    names = []
+    data = []
+    for r in range(FIRST_DATA_ROW, FIRST_DATA_ROW + len(rows)):
+        values = rows.get(r)
+        if values is None or values[0] is None:
+            break
+        names.append(values[0])
+        data.append(values[1:])
+    values = np.array(data, dtype=np.float64).reshape(len(data), len(data_index) - 1)
+    return weights, threshold, names, values
+
+
+def score_sheet(team, weights, threshold, names, values):
+    """
+    SheetScores for values read by read_team_sheet: the cached FINAL SCORE
+    and RANK when every row has them, otherwise both recomputed from the
+    sheet's data, weights and threshold the way the formulas would.
+    """
+    scores, ranks = values[:, -2], values[:, -1]
+    source = CACHED
+    if np.isnan(scores).any() or np.isnan(ranks).any():
+        data = pd.DataFrame(values[:, :-2], columns=team.columns)
+        leave_threshold = team.leave_threshold if np.isnan(threshold) else threshold
+        # Blank weight cells count as 0, as ($A$6/100) does in the FINAL SCORE formula
+        scores = final_scores(data, np.nan_to_num(weights), leave_threshold, team.metrics)
+        ranks = rank_descending(scores)
+        source = COMPUTED
+    return SheetScores(team, tuple(weights), threshold, names, scores,
+                       ranks.astype(np.int64), source)
+
+
+def read_workbook(path):
+    """
+    SheetScores for every team sheet of the workbook at `path`. Sheets whose
+    title matches no declared team are skipped.
+    """
+    sheets = []
+    with zipfile.ZipFile(path) as archive:
+        parts = sheet_parts(archive)
+        strings = []
+
+        def shared_strings():
+            if not strings:
+                strings.append(read_shared_strings(archive))
+            return strings[0]
+
+        for team in TEAMS:
+            if team.sheet in parts:
+                read = read_team_sheet(archive, parts[team.sheet], team, shared_strings)
+                sheets.append(score_sheet(team, *read))
+    return sheets
+
+
+def _read_file(path):
+    """Worker: (path, SheetScores list, error message or None)."""
+    try:
+        return path, read_workbook(path), None
+    except (OSError, zipfile.BadZipFile, KeyError, ValueError) as exc:
+        return path, [], f"{type(exc).__name__}: {exc}"
+
+
+def _weight_headers():
+    headers = {}
+    for team in TEAMS:
+        for metric in team.metrics:
+            headers.setdefault(metric.weight_header, None)
+    return list(headers)
+
+
+def scores_table(workbooks):
+    """
+    One DataFrame from (path, SheetScores list) pairs; see collect for the
+    columns.
+    """
+    sheets = [(path, sheet) for path, found in workbooks for sheet in found]
+    counts = np.array([len(sheet.names) for _, sheet in sheets], dtype=np.int64)
+
+    def per_sheet(values, dtype=None):
+        return np.repeat(np.asarray(values, dtype=dtype), counts)
+
+    def categorical(labels):
+        categories = list(dict.fromkeys(labels))
+        codes = {label: code for code, label in enumerate(categories)}
+        return pd.Categorical.from_codes(per_sheet([codes[label] for label in labels], np.int64),
+                                         categories=categories)
+
+    table = pd.DataFrame({
+        'File': categorical([path for path, _ in sheets]),
+        'Team': categorical([sheet.team.short for _, sheet in sheets]),
+        'Name': np.array(list(chain.from_iterable(sheet.names for _, sheet in sheets)), dtype=object),
+        'FinalScore': np.concatenate([sheet.scores for _, sheet in sheets] or [np.empty(0)]),
+        'Rank': np.concatenate([sheet.ranks for _, sheet in sheets] or [np.empty(0, np.int64)]),
+        'ScoreSource': categorical([sheet.source for _, sheet in sheets]),
+        'LeaveThreshold': per_sheet([sheet.threshold for _, sheet in sheets], np.float64),
+    })
+    for header in _weight_headers():
+        table[header] = per_sheet([
+            dict(zip((metric.weight_header for metric in sheet.team.metrics), sheet.weights)).get(header, np.nan)
+            for _, sheet in sheets], np.float64)
+    return table
+
+
+def collect(paths, processes=None, chunksize=None):
+    """
+    Gather the scores of every workbook in `paths` into one DataFrame.
+
+    Columns: File, Team, Name, FinalScore, Rank, ScoreSource ('cached' or
+    'computed'), LeaveThreshold and one weight column per metric (its row-5
+    header, e.g. 'Leave %'), blank for teams without that metric. File, Team
+    and ScoreSource are categorical. Returns (DataFrame, {path: error}) with
+    the files that could not be read.
+    """
+    paths = list(paths)
+    if processes == 1 or len(paths) <= 1:
+        results = [_read_file(path) for path in paths]
+    else:
+        if chunksize is None:
+            workers = processes or os.cpu_count() or 1
+            chunksize = max(1, min(64, len(paths) // (4 * workers)))
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_read_file, paths, chunksize=chunksize))
+
+    errors = {path: error for path, _, error in results if error}
+    return scores_table((path, sheets) for path, sheets, _ in results), errors
+
+
+def write_table(table, path):
+    """Write the collected table to .parquet, .csv or an .xlsx sheet."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet':
+        table.to_parquet(path, index=False)
+    elif ext == '.csv':
+        table.to_csv(path, index=False)
+    else:
+        table.to_excel(path, sheet_name='Collected_Scores', index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Collect weights, thresholds and scores from many workbooks.")
+    parser.add_argument('root', help="directory of evaluation workbooks (searched recursively)")
+    parser.add_argument('--pattern', default="*.xlsx", help="file name pattern")
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('-o', '--output', default='collected_scores.parquet',
+                        help=".parquet, .csv or .xlsx")
+    args = parser.parse_args(argv)
+
+    paths = find_workbooks(args.root, args.pattern)
+    if not paths:
+        parser.error(f"no files matching {args.pattern!r} under {args.root}")
+
+    start = time.perf_counter()
+    table, errors = collect(paths, processes=args.processes)
+    elapsed = time.perf_counter() - start
+    for path, error in errors.items():
+        print(f"⚠ skipped {path}: {error}")
+    write_table(table, args.output)
+    computed = int((table['ScoreSource'] == COMPUTED).sum())
+    print(f"✓ {len(table)} employees from {len(paths) - len(errors)} workbooks in {elapsed:.1f}s "
+          f"({computed} scores recomputed): {args.output}")
+
+
+if __name__ == '__main__':
+    main()
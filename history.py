@@ -0,0 +1,311 @@
+"""
+================================================================================
+PERIOD HISTORY STORE - COLUMNAR, MEMORY-MAPPED, APPENDED BY EVERY RUN
+================================================================================
+
+Keeps each evaluated period's rosters so year-over-year reviews do not depend
+on old workbooks. Every run appends one partition per team and period:
+
+    history/
+        QC/2026-08.arrow            Name + every numeric roster column
+        QC/2026-09.arrow
+        Production/2026-09.arrow
+        Grades/2026-09.arrow        long (Name, Grade) rows, see append_grades()
+
+Partitions are uncompressed Arrow IPC files, so reads memory-map them and
+hand NumPy the column buffers without copying. Re-running a period replaces
+its partition. Names are dictionary-encoded; across periods they are joined
+into one employees x periods matrix per column, and all trend metrics are
+column-wise NumPy passes over that matrix:
+
+    <col>_mean   mean over the last `window` periods (periods without the
+                 employee are skipped)
+    <col>_slope  least-squares change per period over the same window
+    <col>_yoy    latest period minus the same month a year earlier
+    Periods      periods in the window the employee appears in
+
+Consistency (README section 5, C = f_max / n) comes from the stored grades
+only; periods without a grades partition contribute nothing. Employees with
+fewer than MIN_GRADES grades get no value (one grade is always C = 1).
+Grades partitions hold one period's grades each; append_grades() imports
+them, for example when backfilling history.
+
+Usage:
+    append_period("history", "2026-09", PROD_TEAM, prod_data)
+    trends = trend_metrics("history", PROD_TEAM, window=12)
+    prod_data['Consistency'] = prod_data['Name'].map(consistency_from_history("history"))
+
+    python history.py history/ --team Production --window 24 -o trends.csv
+"""
+
+import argparse
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from schema import TEAMS
+
+GRADES = 'Grades'
+MIN_GRADES = 3
+PERIOD_PATTERN = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')  # YYYY-MM
+EXTENSION = '.arrow'
+
+# Derived from the history itself, so never stored
+NOT_STORED = ('Consistency',)
+
+
+def check_period(period):
+    """Return `period` if it is a YYYY-MM month, else raise ValueError."""
+    period = str(period)
+    if not PERIOD_PATTERN.match(period):
+        raise ValueError(f"period {period!r} is not a YYYY-MM month")
+    return period
+
+
+def shift_period(period, months):
+    """`period` moved by `months` (negative moves back)."""
+    year, month = map(int, check_period(period).split('-'))
+    index = year * 12 + month - 1 + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _partition_dir(root, group):
+    return os.path.join(root, group.short if hasattr(group, 'short') else group)
+
+
+def periods(root, group):
+    """Stored periods of a team (or of GRADES), oldest first."""
+    folder = _partition_dir(root, group)
+    if not os.path.isdir(folder):
+        return []
+    stems = (name[:-len(EXTENSION)] for name in os.listdir(folder) if name.endswith(EXTENSION))
+    return sorted(stem for stem in stems if PERIOD_PATTERN.match(stem))
+
+
+def _write_partition(root, group, period, table):
+    """Write one partition atomically, replacing an earlier one for the period."""
+    folder = _partition_dir(root, group)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, check_period(period) + EXTENSION)
+    tmp = path + '.tmp'
+    with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+    return path
+
+
+def _names(values):
+    return pa.array(pd.Series(values).astype(str).to_numpy(dtype=object), pa.string()).dictionary_encode()
+
+
+def append_period(root, period, team, df):
+    """
+    Store `df`'s Name and numeric columns as `team`'s partition for `period`.
+    Values are kept as float64; NaN marks a missing value.
+    """
+    columns = [col for col in df.columns
+               if col != 'Name' and col not in NOT_STORED and pd.api.types.is_numeric_dtype(df[col])]
+    arrays = [_names(df['Name'])]
+    arrays += [pa.array(df[col].to_numpy(dtype=np.float64)) for col in columns]
+    return _write_partition(root, team, period, pa.Table.from_arrays(arrays, ['Name'] + columns))
+
+
+def append_grades(root, period, grades):
+    """Store a long (Name, Grade) DataFrame as the grades partition for `period`."""
+    table = pa.Table.from_arrays([_names(grades['Name']), _names(grades['Grade'])], ['Name', 'Grade'])
+    return _write_partition(root, GRADES, period, table)
+
+
+def _read_partition(root, group, period):
+    """A partition's table, backed by a memory map of the file (no copy)."""
+    path = os.path.join(_partition_dir(root, group), period + EXTENSION)
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def _dictionary_parts(column):
+    """(codes, labels) of a dictionary-encoded column read back from a partition."""
+    column = column.combine_chunks()
+    return column.indices.to_numpy(zero_copy_only=False), column.dictionary.to_numpy(zero_copy_only=False)
+
+
+def _union(parts):
+    """
+    Sorted union of the labels of (codes, labels) parts, and each part's
+    codes translated into positions in it. Labels are hashed, not sorted,
+    and a dictionary equal to the previous part's reuses its translation.
+    """
+    if not parts:
+        return np.array([], dtype=object), []
+    distinct = []  # (labels, index of the first part using them)
+    for i, (_, labels) in enumerate(parts):
+        previous = distinct[-1][0] if distinct else None
+        if previous is None or len(labels) != len(previous) or not np.array_equal(labels, previous):
+            distinct.append((labels, i))
+    names = pd.Index(np.concatenate([labels for labels, _ in distinct])).unique().sort_values()
+
+    positions, translation = [], None
+    starts = {i: labels for labels, i in distinct}
+    for i, (codes, _) in enumerate(parts):
+        if i in starts:
+            translation = names.get_indexer(starts[i])
+        positions.append(translation[codes])
+    return names.to_numpy(dtype=object), positions
+
+
+def load_matrix(root, team, columns, window=None):
+    """
+    One employees x periods float64 matrix per column over the last `window`
+    stored periods (all when None).
+
+    Returns (names, periods, {column: matrix}); a cell is NaN where the
+    employee or the column is missing in that period.
+    """
+    selected = periods(root, team)
+    if window:
+        selected = selected[-window:]
+    tables = [_read_partition(root, team, period) for period in selected]
+    names, positions = _union([_dictionary_parts(table.column('Name')) for table in tables])
+
+    matrices = {col: np.full((len(names), len(selected)), np.nan) for col in columns}
+    for j, (table, rows) in enumerate(zip(tables, positions)):
+        for col in columns:
+            if col in table.column_names:
+                matrices[col][rows, j] = table.column(col).to_numpy()
+    return names, selected, matrices
+
+
+def rolling_means(values, window):
+    """
+    Mean of each row over trailing windows of `window` periods, skipping NaN;
+    same shape as `values` (NaN where a window holds no value).
+    """
+    present = ~np.isnan(values)
+    sums = np.cumsum(np.where(present, values, 0.0), axis=1)
+    counts = np.cumsum(present, axis=1)
+    sums[:, window:] = sums[:, window:] - sums[:, :-window]
+    counts[:, window:] = counts[:, window:] - counts[:, :-window]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def slopes(values):
+    """Least-squares slope of each row against the period index, skipping NaN."""
+    present = ~np.isnan(values)
+    t = np.broadcast_to(np.arange(values.shape[1], dtype=np.float64), values.shape)
+    n = present.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t_mean = np.where(present, t, 0).sum(axis=1) / n
+        y_mean = np.where(present, values, 0).sum(axis=1) / n
+        dt = np.where(present, t - t_mean[:, None], 0)
+        dy = np.where(present, values - y_mean[:, None], 0)
+        denominator = (dt * dt).sum(axis=1)
+        return np.where(denominator > 0, (dt * dy).sum(axis=1) / denominator, np.nan)
+
+
+def trend_metrics(root, team, columns=None, window=12):
+    """
+    Trend metrics per employee over `team`'s last `window` stored periods;
+    one row per Name. `columns` defaults to the team's metric columns.
+    """
+    columns = list(columns or [col for col in team.columns if col not in NOT_STORED])
+    # A year-over-year change needs the period 12 months before the latest
+    names, stored, matrices = load_matrix(root, team, columns, window=max(window, 13))
+    in_window = slice(max(len(stored) - window, 0), None)
+
+    result = {}
+    for col in columns:
+        values = matrices[col]
+        recent = values[:, in_window]
+        result[f'{col}_mean'] = rolling_means(recent, window)[:, -1] if recent.size else np.nan
+        result[f'{col}_slope'] = slopes(recent) if recent.size else np.nan
+        result[f'{col}_yoy'] = np.nan
+        if stored:
+            year_ago = shift_period(stored[-1], -12)
+            if year_ago in stored:
+                result[f'{col}_yoy'] = values[:, -1] - values[:, stored.index(year_ago)]
+
+    any_value = np.zeros((len(names), len(stored[in_window])), dtype=bool)
+    for col in columns:
+        any_value |= ~np.isnan(matrices[col][:, in_window])
+    result['Periods'] = any_value.sum(axis=1)
+    return pd.DataFrame(result, index=pd.Index(names, name='Name'))
+
+
+def _grade_codes(root, window):
+    """
+    (name labels, name codes, grade codes) of every grade stored for the
+    last `window` graded periods (all when None).
+    """
+    graded = periods(root, GRADES)
+    if window:
+        graded = graded[-window:]
+
+    name_parts, grade_parts = [], []
+    for period in graded:
+        table = _read_partition(root, GRADES, period)
+        name_parts.append(_dictionary_parts(table.column('Name')))
+        codes, labels = _dictionary_parts(table.column('Grade'))
+        grade_parts.append((codes, labels.astype(str)))
+
+    if not name_parts:
+        return np.array([], dtype=object), np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    names, name_positions = _union(name_parts)
+    _, grade_positions = _union(grade_parts)
+    return names, np.concatenate(name_positions), np.concatenate(grade_positions)
+
+
+def consistency_from_history(root, window=None, min_grades=MIN_GRADES):
+    """
+    Consistency index C = f_max / n per employee from the stored grades of
+    the last `window` graded periods (all when None), as a Name -> C Series;
+    NaN for employees with fewer than `min_grades` grades. Empty when no
+    grades are stored.
+    """
+    names, name_codes, grade_codes = _grade_codes(root, window)
+    if not len(names):
+        return pd.Series(dtype='float64')
+    n_grades = int(grade_codes.max()) + 1
+    counts = np.bincount(name_codes * n_grades + grade_codes,
+                         minlength=len(names) * n_grades).reshape(len(names), n_grades)
+    totals = counts.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        index = np.where(totals >= max(min_grades, 1), counts.max(axis=1) / totals, np.nan)
+    return pd.Series(index, index=pd.Index(names, name='Name'), name='Consistency')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trend metrics from the period history store.")
+    parser.add_argument('root', help="history directory")
+    parser.add_argument('--team', default=TEAMS[-1].short, choices=[team.short for team in TEAMS])
+    parser.add_argument('--columns', nargs='+', help="columns to trend (default: the team's metrics)")
+    parser.add_argument('--window', type=int, default=12, help="periods (months) to look back")
+    parser.add_argument('-o', '--output', help=".csv, .parquet or .xlsx (default: print)")
+    args = parser.parse_args(argv)
+
+    team = next(team for team in TEAMS if team.short == args.team)
+    stored = periods(args.root, team)
+    if not stored:
+        parser.error(f"no {team.short} periods stored in {args.root}")
+    trends = trend_metrics(args.root, team, args.columns, args.window)
+    if 'Consistency' in team.columns:
+        trends['Consistency'] = consistency_from_history(args.root, args.window).reindex(trends.index)
+
+    print(f"{team.name}: {len(trends)} employees, periods {stored[0]} .. {stored[-1]}")
+    if not args.output:
+        print(trends.round(3).to_string())
+    elif args.output.endswith('.parquet'):
+        trends.to_parquet(args.output)
+    elif args.output.endswith('.xlsx'):
+        trends.to_excel(args.output, sheet_name='Trends')
+    else:
+        trends.to_csv(args.output)
+    if args.output:
+        print(f"✓ Trend metrics saved: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+"""
+================================================================================
+INCREMENTAL REGENERATION - PATCH CHANGED EMPLOYEES IN AN EXISTING WORKBOOK
+================================================================================
+
+Diffs a new roster against the data rows already in the workbook, keyed by
+Name, and rewrites only what changed: the data cells of changed employees,
+rows for added employees and the rows freed by removed ones. Everything else
+in the sheet XML (weights in row 6, the leave threshold in K5 / M5, formulas,
+styles, hidden helper blocks) is streamed through untouched.
+
+Rows keep their positions. A removed employee's row is reused for an added
+employee, or for one moved up from the end of the sheet so the data block
+stays contiguous; extra employees get new rows filled down from the last
+data row. Range ends ($9:$<last row>) follow the new row count.
+"""
+
+import bisect
+import math
+import re
+import shutil
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+from cached_values import cell_value, read_shared_strings, replacing, row_pieces, sheet_parts
+from schema import FIRST_DATA_ROW
+
+ROW = re.compile(r'<row\b([^>]*?)(?:/>|>(.*?)</row>)', re.S)
+CELL = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+# A cell in one of `columns` holding a plain value (formula cells do not match)
+VALUE_CELL = r'<c r="({columns})([0-9]+)"([^>]*?)(?:/>|>(?:<v>([^<]*)</v>|<is>(.*?)</is>)</c>)'
+FORMULA = re.compile(r'<f\b([^>]*?)(?:/>|>(.*?)</f>)', re.S)
+ATTR = re.compile(r'([\w:]+)="([^"]*)"')
+COORD = re.compile(r'([A-Z]+)([0-9]+)')
+ROW_TAG = re.compile(r'<row r="([0-9]+)"')
+DIMENSION = re.compile(r'<dimension ref="([A-Z]+[0-9]+):([A-Z]+)([0-9]+)"')
+
+# Formula cells that carry a cached result, and shared formula masters
+CACHED_FORMULA = re.compile(r'<c\b([^>]*)>(<f\b[^>]*?(?:/>|>[^<]*</f>))<v>[^<]*</v></c>')
+TYPE_ATTR = re.compile(r'\s+t="[^"]*"')
+SHARED_MASTER = re.compile(r'<c r="([A-Z]+)([0-9]+)"[^>]*><f\b([^>]*\bt="shared"[^>]*)>([^<]+)</f>')
+SHARED_REF = re.compile(r'(<f\b[^>]*\bt="shared"[^>]*\bref="[A-Z]+[0-9]+:[A-Z]+)([0-9]+)"')
+
+# A cell reference inside a formula, e.g. B12, $A$6, H$9
+REF = re.compile(r'(?<![A-Za-z0-9_.$])(\$?)([A-Z]{1,3})(\$?)([0-9]+)(?![0-9A-Za-z_(])')
+
+
+def read_data_rows(archive, part, columns, strings):
+    """
+    Return (row 8 Name header, data rows): a DataFrame of the cells under
+    `columns` (A, B, ...) from row 9 down to the last row with a Name.
+    `strings` returns the shared string table.
+    """
+    index = {get_column_letter(col): col - 1 for col in range(1, len(columns) + 1)}
+    value_cell = re.compile(VALUE_CELL.format(columns='|'.join(index)), re.S)
+    rows = {}
+    with archive.open(part) as src:
+        for piece in row_pieces(src):
+            for col, row, attrs, value, inline in value_cell.findall(piece):
+                r = int(row)
+                if r < FIRST_DATA_ROW - 1:
+                    continue
+                values = rows.get(r)
+                if values is None:
+                    values = rows[r] = [None] * len(columns)
+                if value and ('t="' not in attrs or 't="n"' in attrs):
+                    values[index[col]] = float(value)
+                else:
+                    values[index[col]] = cell_value(attrs, value, inline, strings)
+
+    header = rows.get(FIRST_DATA_ROW - 1, [None])[0]
+    data = []
+    for r in range(FIRST_DATA_ROW, FIRST_DATA_ROW + len(rows)):
+        values = rows.get(r)
+        if values is None or values[0] is None:
+            break
+        data.append(values)
+    return header, pd.DataFrame.from_records(data, columns=columns)
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _stored(value):
+    """A float as the workbook holds it: 16 significant digits, as openpyxl writes."""
+    return float('%.16g' % value)
+
+
+def _differs(before, after):
+    differs = ~((before == after) | (pd.isna(before) & pd.isna(after)))
+    if after.dtype.kind == 'f':
+        # The file has 0.3 for 0.30000000000000004; compare the remaining
+        # candidates as they would be stored
+        for i in np.flatnonzero(differs):
+            if isinstance(before[i], (int, float)) and not math.isnan(after[i]):
+                differs[i] = before[i] != _stored(after[i])
+    return differs
+
+
+def _scalar(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def plan_update(old, df, columns):
+    """
+    Work out which data cells to write for the new roster `df`, given the
+    `old` data rows read from the workbook.
+
+    Returns (last_row, writes, counts): the new last data row, {row: {column
+    index: value}} for every cell that must change, and the number of
+    changed, added and removed employees.
+    """
+    if not len(df):
+        raise ValueError("new roster has no employees")
+    old_names = pd.Index(old['Name'].astype(str), dtype=object)
+    new_names = pd.Index(df['Name'].astype(str), dtype=object)
+    if new_names.has_duplicates:
+        raise ValueError("new roster has duplicate names")
+    if old_names.has_duplicates:
+        raise ValueError("workbook has duplicate names")
+
+    old_last = FIRST_DATA_ROW + len(old) - 1
+    new_last = FIRST_DATA_ROW + len(df) - 1
+    new_columns = [new_names.to_numpy()] + [df[col].to_numpy() for col in columns[1:]]
+
+    def new_row(i):
+        return {col: _scalar(values[i]) for col, values in enumerate(new_columns, start=1)}
+
+    # Employees in both: compare column by column, blanks equal to blanks
+    kept = old_names.isin(new_names)
+    old_rows = np.flatnonzero(kept) + FIRST_DATA_ROW
+    positions = new_names.get_indexer(old_names[kept])
+    differs = np.column_stack([np.zeros(len(positions), dtype=bool)] + [
+        _differs(old[col].to_numpy()[kept], values[positions])
+        for col, values in zip(columns[1:], new_columns[1:])
+    ])
+    changed = np.flatnonzero(differs.any(axis=1))
+
+    writes = {}
+    for i in changed:
+        if old_rows[i] <= new_last:
+            writes[int(old_rows[i])] = {int(col) + 1: _scalar(new_columns[col][positions[i]])
+                                        for col in np.flatnonzero(differs[i])}
+
+    # Free rows inside the new block take employees from below it, then new ones
+    removed_rows = np.flatnonzero(~kept) + FIRST_DATA_ROW
+    free = [int(r) for r in removed_rows if r <= new_last] + list(range(old_last + 1, new_last + 1))
+    added = np.flatnonzero(~new_names.isin(old_names))
+    movers = list(positions[old_rows > new_last]) + list(added)
+    for r, i in zip(free, movers):
+        writes[r] = new_row(i)
+
+    counts = {'changed': len(changed), 'added': len(added), 'removed': len(removed_rows)}
+    return new_last, writes, counts
+
+
+def shift_formula(text, rows, columns=0):
+    """Move the relative references in a formula by `rows` and `columns`."""
+    def move(match):
+        col_abs, col, row_abs, row = match.groups()
+        if not col_abs and columns:
+            col = get_column_letter(column_index_from_string(col) + columns)
+        if not row_abs:
+            row = str(int(row) + rows)
+        return f'{col_abs}{col}{row_abs}{row}'
+    return REF.sub(move, text)
+
+
+def _range_end(before_row, end):
+    """Match `end` where it closes a range starting at row 9, e.g. the $24 of B$9:B$24."""
+    starts = '|'.join(f'(?<={before_row}9:{col_abs}[A-Z]{{{n}}}{re.escape(end)})'
+                      for col_abs in ('', r'\$') for n in (1, 2, 3))
+    return re.compile(rf'{re.escape(end)}(?![0-9])(?:{starts})')
+
+
+def _value_xml(coord, style, value):
+    style_attr = f' s="{style}"' if style is not None else ''
+    if _missing(value):
+        return f'<c r="{coord}"{style_attr}/>'
+    if isinstance(value, str):
+        return f'<c r="{coord}"{style_attr} t="inlineStr"><is><t>{escape(value)}</t></is></c>'
+    if isinstance(value, bool):
+        return f'<c r="{coord}"{style_attr} t="b"><v>{int(value)}</v></c>'
+    text = '%.16g' % value if isinstance(value, float) else str(int(value))
+    return f'<c r="{coord}"{style_attr} t="n"><v>{text}</v></c>'
+
+
+def _drop_cached_value(match):
+    attrs = TYPE_ATTR.sub('', match.group(1))
+    return f'<c{attrs}>{match.group(2)}</c>'
+
+
+class _SheetPatcher:
+    """Rewrites one sheet part row by row according to a plan_update() result."""
+
+    def __init__(self, old_last, new_last, writes):
+        self.old_last = old_last
+        self.new_last = new_last
+        self.writes = writes
+        self.written_rows = sorted(writes)
+        self.styles = {}   # data column index -> style id, from the first data row
+        self.shared = {}   # shared formula index -> (text, row, column) of its master
+
+        # Ranges from row 9 to the old last row: B$9:B$24, $V$9:$V$24, H9:H24.
+        # A relative end under an anchored start (V$9:V24) is row-local and kept.
+        # The row number comes first so the scan can skip ahead to it.
+        self.data_ranges = [
+            (_range_end(r'[A-Z$]', f'${old_last}'), f'${new_last}'),
+            (_range_end(r'[A-Z]', f'{old_last}'), f'{new_last}'),
+        ]
+
+    def resize(self, text):
+        """Point ranges that run from row 9 to the old last data row at the new last row."""
+        if self.new_last != self.old_last:
+            for pattern, end in self.data_ranges:
+                text = pattern.sub(end, text)
+        return text
+
+    def patch(self, text):
+        """Patch a piece of sheet XML made of whole <row> elements and the text between them."""
+        text = self._bulk(text)
+        tags = [(int(m.group(1)), m.start()) for m in ROW_TAG.finditer(text)]
+        if not tags:
+            return text
+        first, last = tags[0][0], tags[-1][0]
+        if self.new_last > self.old_last and last > self.old_last:
+            for r, _ in tags:
+                if self.old_last < r <= self.new_last:
+                    raise ValueError(f"row {r} below the data block is in the way of new employees")
+
+        # Only a few rows need more than the piece-wide passes
+        special = set(self.writes_in(first, last))
+        special.update(r for r in (FIRST_DATA_ROW, self.old_last) if first <= r <= last)
+        deleted = range(max(first, self.new_last + 1), min(last, self.old_last) + 1)
+
+        out = []
+        pos = 0
+        for r, start in tags:
+            if r in deleted:
+                out.append(text[pos:start])
+                pos = ROW.match(text, start).end()
+            elif r in special:
+                match = ROW.match(text, start)
+                out.append(text[pos:start])
+                out.append(self._row(r, match))
+                pos = match.end()
+        out.append(text[pos:])
+        return ''.join(out)
+
+    def writes_in(self, first, last):
+        lo = bisect.bisect_left(self.written_rows, first)
+        hi = bisect.bisect_right(self.written_rows, last)
+        return self.written_rows[lo:hi]
+
+    def _bulk(self, text):
+        """Piece-wide passes: resize ranges, clamp shared formula ranges, drop cached results."""
+        text = self.resize(text)
+        if 't="shared"' in text:
+            if self.new_last < self.old_last:
+                text = SHARED_REF.sub(lambda m: f'{m.group(1)}{min(int(m.group(2)), self.new_last)}"', text)
+            for master in SHARED_MASTER.finditer(text):
+                si = re.search(r'\bsi="([0-9]+)"', master.group(3)).group(1)
+                self.shared[si] = (master.group(4), int(master.group(2)),
+                                   column_index_from_string(master.group(1)))
+        if '</f><v>' in text or '/><v>' in text:
+            text = CACHED_FORMULA.sub(_drop_cached_value, text)
+        if '<dimension ' in text:
+            text = DIMENSION.sub(self._dimension, text)
+        return text
+
+    def _dimension(self, match):
+        end_row = int(match.group(3))
+        if end_row == self.old_last:
+            end_row = self.new_last
+        return f'<dimension ref="{match.group(1)}:{match.group(2)}{end_row}"'
+
+    def _row(self, r, match):
+        """A data row with cells to write, or one whose styles or layout are needed."""
+        attrs = match.group(1)
+        cells = self._cells(match.group(2) or '')
+        if r == FIRST_DATA_ROW:
+            self.styles = {col: cell['attrs'].get('s') for col, cell in cells.items()}
+        template = dict(cells)
+        for col, value in self.writes.get(r, {}).items():
+            style = cells[col]['attrs'].get('s') if col in cells else self.styles.get(col)
+            cells[col] = {'attrs': {}, 'xml': _value_xml(f'{get_column_letter(col)}{r}', style, value)}
+        out = [self._rebuild(attrs, cells)]
+        if r == self.old_last:
+            for new_r in range(r + 1, self.new_last + 1):
+                out.append(self._fill_down(attrs, r, new_r, template))
+        return ''.join(out)
+
+    def _cells(self, body):
+        """Parse a row body into {column index: cell}."""
+        cells = {}
+        for match in CELL.finditer(body):
+            attrs = dict(ATTR.findall(match.group(1)))
+            cell = {'attrs': attrs, 'xml': match.group(0)}
+            formula = FORMULA.search(match.group(2) or '')
+            if formula:
+                cell['f_attrs'], cell['f_text'] = dict(ATTR.findall(formula.group(1))), formula.group(2)
+            cells[column_index_from_string(COORD.fullmatch(attrs['r']).group(1))] = cell
+        return cells
+
+    @staticmethod
+    def _rebuild(attrs, cells):
+        body = ''.join(cells[col]['xml'] for col in sorted(cells))
+        return f'<row{attrs}>{body}</row>' if body else f'<row{attrs}/>'
+
+    def _fill_down(self, row_attrs, template_r, r, template):
+        """A new data row at `r`, copied from the last original data row."""
+        attrs = re.sub(r' r="[0-9]+"', f' r="{r}"', row_attrs)
+        writes = self.writes.get(r, {})
+        parts = []
+        for col in sorted(set(template) | set(writes)):
+            coord = f'{get_column_letter(col)}{r}'
+            if col in writes:
+                style = template[col]['attrs'].get('s') if col in template else self.styles.get(col)
+                parts.append(_value_xml(coord, style, writes[col]))
+                continue
+            cell = template[col]
+            style = cell['attrs'].get('s')
+            text = self._template_formula(cell, template_r, col)
+            if text is None:
+                parts.append(f'<c r="{coord}" s="{style}"/>' if style is not None else f'<c r="{coord}"/>')
+            else:
+                text = shift_formula(text, r - template_r)
+                style_attr = f' s="{style}"' if style is not None else ''
+                parts.append(f'<c r="{coord}"{style_attr}><f>{text}</f></c>')
+        return f'<row{attrs}>{"".join(parts)}</row>'
+
+    def _template_formula(self, cell, r, col):
+        """The formula text of a template cell at (r, col), or None for non-formula cells."""
+        f_attrs = cell.get('f_attrs')
+        if f_attrs is None or f_attrs.get('t') == 'array':
+            return None
+        if f_attrs.get('t') == 'shared' and not cell['f_text']:
+            text, master_r, master_col = self.shared[f_attrs['si']]
+            return shift_formula(text, r - master_r, col - master_col)
+        return cell['f_text']
+
+    def stream(self, src, dst):
+        for piece in row_pieces(src):
+            dst.write(self.patch(piece).encode("utf-8"))
+
+
+def _force_recalculation(workbook_xml):
+    """Set fullCalcOnLoad so patched formulas are recalculated when the file is opened."""
+    calc = re.search(r'<calcPr\b[^>]*?/?>', workbook_xml)
+    if calc:
+        tag = re.sub(r'\s+fullCalcOnLoad="[^"]*"', '', calc.group(0))
+        tag = re.sub(r'\s*(/?>)$', r' fullCalcOnLoad="1"\1', tag)
+        return workbook_xml[:calc.start()] + tag + workbook_xml[calc.end():]
+    anchor = re.search(r'<(?:oleSize|customWorkbookViews|pivotCaches|smartTagPr|smartTagTypes|'
+                       r'webPublishing|fileRecoveryPr|webPublishObjects|extLst)\b|</workbook>', workbook_xml)
+    return workbook_xml[:anchor.start()] + '<calcPr fullCalcOnLoad="1"/>' + workbook_xml[anchor.start():]
+
+
+def _drop_calc_chain(name, xml):
+    """Remove references to calcChain.xml, which lists formula cells that may no longer exist."""
+    if name == "[Content_Types].xml":
+        return re.sub(r'<Override\b[^>]*calcChain\.xml"[^>]*/>', '', xml)
+    return re.sub(r'<Relationship\b[^>]*calcChain\.xml"[^>]*/>', '', xml)
+
+
+def update_workbook(path, sheets):
+    """
+    Patch the workbook at `path` in place for new rosters.
+
+    `sheets` maps a sheet title to (DataFrame, data columns), where the data
+    columns are the DataFrame columns shown in A, B, ... of the data block.
+    Returns {title: {'changed': n, 'added': n, 'removed': n}}. The file is
+    left untouched when nothing changed.
+    """
+    plans = {}
+    summary = {}
+    with zipfile.ZipFile(path) as archive:
+        parts = sheet_parts(archive)
+        strings = []
+
+        def shared_strings():
+            if not strings:
+                strings.append(read_shared_strings(archive))
+            return strings[0]
+
+        for title, (df, columns) in sheets.items():
+            header, old = read_data_rows(archive, parts[title], columns, shared_strings)
+            if header != 'Name':
+                raise ValueError(f"{path}: sheet {title!r} has no data header in row {FIRST_DATA_ROW - 1}")
+            old_last = FIRST_DATA_ROW + len(old) - 1
+            new_last, writes, counts = plan_update(old, df, columns)
+            summary[title] = counts
+            if writes or new_last != old_last:
+                plans[parts[title]] = _SheetPatcher(old_last, new_last, writes)
+    if not plans:
+        return summary
+
+    with replacing(path) as tmp_path, zipfile.ZipFile(path) as src_zip, \
+            zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as dst_zip:
+        for info in src_zip.infolist():
+            name = info.filename
+            if name == "xl/calcChain.xml":
+                continue
+            if name in ("xl/workbook.xml", "xl/_rels/workbook.xml.rels", "[Content_Types].xml"):
+                xml = src_zip.read(name).decode("utf-8")
+                xml = _force_recalculation(xml) if name == "xl/workbook.xml" else _drop_calc_chain(name, xml)
+                dst_zip.writestr(info, xml.encode("utf-8"))
+                continue
+            with src_zip.open(info) as src, dst_zip.open(info, "w") as dst:
+                if name in plans:
+                    plans[name].stream(src, dst)
+                else:
+                    shutil.copyfileobj(src, dst)
+    return summary
@@ -0,0 +1,304 @@
+"""
+================================================================================
+CHUNKED ROSTER INGESTION - CSV / EXCEL / PARQUET SOURCE FILES
+================================================================================
+
+Streams source exports (e.g. the KDxx Operator Analysis files) in fixed-size
+chunks, keeps only the columns the evaluation needs, pins compact dtypes
+(category for Name, float32 for hours, scores and counts) and derives
+TotalWorkHrs, ProdToQCRatio and Consistency chunk by chunk. The full raw
+table is never materialized.
+
+Counts are float32 rather than int32 so that a blank cell loads as NaN and
+counts like any other blank (0 in the row formula, skipped by MIN/MAX);
+float32 holds every whole number up to 16,777,216 exactly. Derived columns
+are computed in float64 from the inputs' shortest decimal forms (widen), so
+they equal what the manual-entry rosters give: 575 / 98 is
+5.86734693877551, not float32's 5.867347.
+
+Usage:
+    qc_data = load_qc("qc_export.csv")
+    prod_data = load_prod("prod_export.parquet", grades="grades.csv")
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Powers of ten that are exact doubles, for widen()
+POWERS_OF_TEN = np.array([float(10 ** k) for k in range(23)])
+
+# Source columns and their pinned dtypes
+QC_DTYPES = {
+    'Name': 'category',
+    'LeaveH': 'float32',
+    'ProductionH': 'float32',
+    'QCworkH': 'float32',
+    'DistinctTasks': 'float32',
+    'ProjectsWorked': 'float32',
+    'TotalTasks': 'float32',
+    'TLScore': 'float32',
+}
+PROD_DTYPES = {
+    'Name': 'category',
+    'LeaveH': 'float32',
+    'ProductionH': 'float32',
+    'QCcheckingH': 'float32',
+    'DistinctTasks': 'float32',
+    'ProjectsWorked': 'float32',
+    'TotalTasks': 'float32',
+    'AvgEvaluation': 'float32',
+}
+GRADE_DTYPES = {
+    'Name': 'category',
+    'Grade': 'category',
+}
+
+
+def iter_chunks(path, dtypes, chunksize=DEFAULT_CHUNK_ROWS, rename=None):
+    """
+    Yield DataFrames of at most `chunksize` rows from a CSV, Excel or Parquet
+    file, restricted to the columns in `dtypes` and cast to those dtypes.
+
+    `rename` maps source headers to the canonical column names.
+    """
+    rename = rename or {}
+    source_name = {canonical: source for source, canonical in rename.items()}
+    columns = [source_name.get(col, col) for col in dtypes]
+    source_dtypes = {source_name.get(col, col): dtype for col, dtype in dtypes.items()}
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet':
+        chunks = _parquet_chunks(path, columns, chunksize)
+    elif ext in ('.xlsx', '.xlsm'):
+        chunks = _excel_chunks(path, columns, chunksize)
+    else:
+        chunks = pd.read_csv(path, usecols=columns, dtype=source_dtypes, chunksize=chunksize)
+
+    for chunk in chunks:
+        yield chunk.astype(source_dtypes).rename(columns=rename)[list(dtypes)]
+
+
+def source_columns(path):
+    """The column headers of a CSV, Excel or Parquet file, without reading its rows."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet':
+        import pyarrow.parquet as pq
+
+        return list(pq.read_schema(path).names)
+    if ext in ('.xlsx', '.xlsm'):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True)
+        try:
+            header = next(wb.active.iter_rows(max_row=1, values_only=True), ())
+        finally:
+            wb.close()
+        return [col for col in header if col is not None]
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _parquet_chunks(path, columns, chunksize):
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
+
+
+def _excel_chunks(path, columns, chunksize):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = list(next(rows))
+        missing = [col for col in columns if col not in header]
+        if missing:
+            raise ValueError(f"{path}: missing columns {missing}")
+        positions = [header.index(col) for col in columns]
+
+        buffer = []
+        for row in rows:
+            buffer.append([row[i] for i in positions])
+            if len(buffer) == chunksize:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        wb.close()
+
+
+def concat_chunks(chunks):
+    """
+    Concatenate chunks, merging per-chunk categories instead of falling back
+    to object. Each column is dropped from the chunks once it is combined, so
+    at most one column is held twice.
+    """
+    chunks = list(chunks)
+    if not chunks:
+        raise ValueError("source file has no data rows")
+    combined = {}
+    for col in list(chunks[0].columns):
+        if isinstance(chunks[0][col].dtype, pd.CategoricalDtype):
+            combined[col] = union_categoricals([chunk[col] for chunk in chunks])
+        else:
+            combined[col] = np.concatenate([chunk[col].to_numpy() for chunk in chunks])
+        for chunk in chunks:
+            del chunk[col]
+    return pd.DataFrame(combined, copy=False)
+
+
+def _float64(column):
+    values = column.to_numpy()
+    return widen(values) if values.dtype == np.float32 else values.astype(np.float64)
+
+
+def derive_qc(chunk):
+    """Add TotalWorkHrs (float64) to a QC chunk."""
+    chunk['TotalWorkHrs'] = _float64(chunk['ProductionH']) + _float64(chunk['QCworkH'])
+    return chunk
+
+
+def derive_prod(chunk):
+    """
+    Add ProdToQCRatio (float64) to a Production chunk. No QC hours gives a
+    blank ratio (NaN), which the sheet and scoring.py treat as missing.
+    """
+    production = _float64(chunk['ProductionH'])
+    qc_checking = _float64(chunk['QCcheckingH'])
+    ratio = np.full(len(chunk), np.nan)
+    np.divide(production, qc_checking, out=ratio, where=qc_checking != 0)
+    chunk['ProdToQCRatio'] = ratio
+    return chunk
+
+
+def consistency_from_grades(path, chunksize=DEFAULT_CHUNK_ROWS, rename=None):
+    """
+    Consistency index per employee from a long (Name, Grade) history file.
+
+    C = f_max / n, where f_max is the frequency of the employee's most common
+    grade and n the number of grades. Counts are accumulated chunk by chunk.
+    """
+    counts = None
+    for chunk in iter_chunks(path, GRADE_DTYPES, chunksize, rename):
+        chunk_counts = chunk.groupby(['Name', 'Grade'], observed=True).size()
+        counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+    if counts is None:
+        return pd.Series(dtype='float32')
+    per_name = counts.groupby(level='Name', observed=True)
+    result = (per_name.max() / per_name.sum()).astype('float32')
+    result.index = result.index.astype(str)
+    return result
+
+
+def _with_extra(dtypes, extra_columns):
+    """Add pass-through columns (e.g. a Department to shard by) as categories."""
+    return {**dtypes, **{col: 'category' for col in extra_columns or () if col not in dtypes}}
+
+
+def load_qc(path, chunksize=DEFAULT_CHUNK_ROWS, rename=None, extra_columns=None):
+    """
+    Load a QC roster in chunks, with TotalWorkHrs derived.
+
+    `extra_columns` are kept alongside the evaluation columns, as categories.
+    """
+    dtypes = _with_extra(QC_DTYPES, extra_columns)
+    return concat_chunks(derive_qc(chunk) for chunk in iter_chunks(path, dtypes, chunksize, rename))
+
+
+def load_prod(path, grades=None, consistency=None, chunksize=DEFAULT_CHUNK_ROWS, rename=None,
+              extra_columns=None):
+    """
+    Load a Production roster in chunks, with ProdToQCRatio and Consistency.
+
+    Consistency comes from a grade-history file (`grades`) or a Name -> score
+    mapping (`consistency`); employees without history get NaN.
+    `extra_columns` are kept as in load_qc().
+    """
+    dtypes = _with_extra(PROD_DTYPES, extra_columns)
+    if grades is not None:
+        consistency = consistency_from_grades(grades, chunksize, rename)
+    if consistency is not None:
+        consistency = pd.Series(consistency, dtype='float32')
+
+    def chunks():
+        for chunk in iter_chunks(path, dtypes, chunksize, rename):
+            chunk = derive_prod(chunk)
+            if consistency is not None:
+                # Look up once per category, then gather by code
+                names = chunk['Name'].cat
+                per_category = consistency.reindex(names.categories).to_numpy(dtype=np.float32)
+                codes = names.codes.to_numpy()
+                chunk['Consistency'] = np.where(codes >= 0, per_category[codes], np.nan).astype(np.float32)
+            yield chunk
+
+    return concat_chunks(chunks())
+
+
+def load_roster(path, grades=None, consistency=None, chunksize=DEFAULT_CHUNK_ROWS):
+    """
+    Load a QC or Production export, whichever its headers are; the
+    Production arguments are those of load_prod(). Raises ValueError when the
+    file has the columns of neither.
+    """
+    columns = set(source_columns(path))
+    if columns.issuperset(QC_DTYPES):
+        return load_qc(path, chunksize)
+    if columns.issuperset(PROD_DTYPES):
+        return load_prod(path, grades, consistency, chunksize)
+    raise ValueError("file is neither a QC nor a Production export (QC: " + ", ".join(QC_DTYPES)
+                     + "; Production: " + ", ".join(PROD_DTYPES) + ")")
+
+
+def widen(values):
+    """
+    A float32 array as float64 through each value's shortest decimal form,
+    the value str() shows: 569.8 becomes 569.8, not 569.7999877929688.
+
+    A float32 spans less than one unit in the 6th significant digit, so at
+    most one 6-digit decimal rounds back to it, and any shorter form is that
+    same number. Each value therefore takes the nearest 6-digit decimal if it
+    rounds back, else the nearest 7-, 8- or 9-digit one. Multiplying or
+    dividing by a power of ten up to 1e22 (exact as a double) rounds like
+    parsing the decimal; values that need a larger power fall back to str().
+    """
+    values = np.asarray(values, dtype=np.float32)
+    wide = values.astype(np.float64)
+    idx = np.flatnonzero(np.isfinite(wide) & (wide != 0))
+    narrow, exact = values[idx], wide[idx]
+    magnitude = np.floor(np.log10(np.abs(exact))).astype(np.int16)
+    # Once a shorter candidate could not be tried, a longer one is not known to be shortest
+    skipped = np.zeros(len(idx), dtype=bool)
+    for digits in range(6, 10):
+        if not len(idx):
+            break
+        places = digits - 1 - magnitude
+        skipped |= np.abs(places) >= len(POWERS_OF_TEN)
+        scale = POWERS_OF_TEN[np.where(skipped, 0, np.abs(places))]
+        with np.errstate(invalid='ignore', over='ignore'):
+            rounded = np.where(places >= 0, np.round(exact * scale) / scale, np.round(exact / scale) * scale)
+            found = ~skipped & (rounded.astype(np.float32) == narrow)
+        wide[idx[found]] = rounded[found]
+        rest = ~found
+        idx, narrow, exact, magnitude, skipped = idx[rest], narrow[rest], exact[rest], magnitude[rest], skipped[rest]
+    if len(idx):
+        wide[idx] = narrow.astype(str).astype(np.float64)
+    return wide
+
+
+def widen_floats(df):
+    """
+    Convert float32 columns to float64 through their shortest decimal form
+    (see widen), so a source value like 569.8 is written to the workbook as
+    569.8 rather than 569.7999877929688.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == np.float32:
+            df[col] = widen(df[col].to_numpy())
+    return df
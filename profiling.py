@@ -0,0 +1,201 @@
+"""
+================================================================================
+STAGE PROFILING - TIMED SPANS AS JSON LINES OR CALLBACKS
+================================================================================
+
+Wraps the stages of a run (data load, derivation, each sheet, the
+instructions sheet, save) in spans. Each span records wall and CPU time,
+the rows it handled and memory deltas, and is emitted when it ends:
+
+    {"span": "rows:QC_Team_Evaluation", "parent": "sheet:QC_Team_Evaluation",
+     "depth": 1, "wall_s": 0.41, "cpu_s": 0.40, "rows": 10000,
+     "rss_delta_bytes": 5242880, "peak_rss_delta_bytes": 4194304, ...}
+
+Spans go to a JSON-lines file, to a callback, or to both. Spans marked hot
+(the data-row loops) can also be captured with cProfile (one .prof file per
+span, for pstats or snakeviz) and with tracemalloc (traced allocation delta,
+peak and the top allocation sites). The builders take a `profiler` that
+defaults to NULL_PROFILER, whose spans do nothing.
+
+Usage:
+    profiler = Profiler(jsonl="spans.jsonl", cprofile_dir="profiles", trace_memory=True)
+    build_workbook("evaluation.xlsx", qc_data, prod_data, profiler=profiler)
+    profiler.close()
+
+    python Excel_Maker.py --profile spans.jsonl --cprofile profiles/ --tracemalloc
+"""
+
+import cProfile
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TOP_ALLOCATIONS = 5
+
+
+def current_rss_bytes():
+    """Resident set size now (Linux), or None."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_bytes():
+    """Peak resident set size so far, or None where unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _delta(after, before):
+    return None if after is None or before is None else after - before
+
+
+class Span:
+    """An open span; `rows` and `attrs` may be filled in while it runs."""
+    __slots__ = ('name', 'rows', 'attrs', 'traced_peak')
+
+    def __init__(self, name, rows=None, attrs=None):
+        self.name = name
+        self.rows = rows
+        self.attrs = attrs or {}
+        self.traced_peak = 0
+
+
+class NullProfiler:
+    """A profiler whose spans cost nothing and record nothing."""
+
+    @contextmanager
+    def span(self, name, rows=None, hot=False, **attrs):
+        yield Span(name, rows, attrs)
+
+    def close(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class Profiler:
+    """
+    Records nested spans and hands each finished one, as a dict, to the
+    JSON-lines file `jsonl` and/or `callback`.
+
+    `cprofile_dir`: write a cProfile .prof file for every hot span there.
+    `trace_memory`: run tracemalloc; every span then reports traced
+    allocation deltas, and hot spans their top allocation sites.
+    """
+
+    def __init__(self, jsonl=None, callback=None, cprofile_dir=None, trace_memory=False):
+        self.callback = callback
+        self.cprofile_dir = cprofile_dir
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stack = []
+        self._file = open(jsonl, 'a', encoding='utf-8') if jsonl else None
+        if cprofile_dir:
+            os.makedirs(cprofile_dir, exist_ok=True)
+        self._started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _fold_traced_peak(self):
+        """
+        Credit the traced peak since the last reset to every open span, then
+        reset it; tracemalloc keeps a single peak, shared by nested spans.
+        """
+        peak = tracemalloc.get_traced_memory()[1]
+        for span in self._stack:
+            span.traced_peak = max(span.traced_peak, peak)
+        tracemalloc.reset_peak()
+
+    def _emit(self, record):
+        self.records.append(record)
+        if self._file:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+        if self.callback:
+            self.callback(record)
+
+    @contextmanager
+    def span(self, name, rows=None, hot=False, **attrs):
+        """Time the enclosed block as span `name`; `hot` marks loops worth profiling."""
+        span = Span(name, rows, attrs)
+        parent = self._stack[-1].name if self._stack else None
+
+        profile = cProfile.Profile() if hot and self.cprofile_dir else None
+        snapshot = tracemalloc.take_snapshot() if hot and self.trace_memory else None
+        traced_before = None
+        if self.trace_memory:
+            self._fold_traced_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+        self._stack.append(span)
+        rss_before, peak_before = current_rss_bytes(), peak_rss_bytes()
+        start_time = time.time()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield span
+        finally:
+            if profile:
+                profile.disable()
+            wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+            if self.trace_memory:
+                self._fold_traced_peak()
+            self._stack.pop()
+
+            record = {
+                'span': span.name,
+                'parent': parent,
+                'depth': len(self._stack),
+                'start': round(start_time, 6),
+                'wall_s': round(wall, 6),
+                'cpu_s': round(cpu, 6),
+                'rows': span.rows,
+                'rss_delta_bytes': _delta(current_rss_bytes(), rss_before),
+                'peak_rss_delta_bytes': _delta(peak_rss_bytes(), peak_before),
+            }
+            if span.rows and wall > 0:
+                record['rows_per_s'] = round(span.rows / wall, 1)
+            if self.trace_memory:
+                record['traced_delta_bytes'] = tracemalloc.get_traced_memory()[0] - traced_before
+                record['traced_peak_bytes'] = span.traced_peak
+            if snapshot is not None:
+                stats = tracemalloc.take_snapshot().compare_to(snapshot, 'lineno')
+                record['top_allocations'] = [
+                    {'site': str(stat.traceback), 'size_delta_bytes': stat.size_diff, 'count_delta': stat.count_diff}
+                    for stat in stats[:TOP_ALLOCATIONS]
+                ]
+            if profile:
+                path = os.path.join(self.cprofile_dir, re.sub(r'[^A-Za-z0-9._-]+', '_', span.name) + '.prof')
+                profile.dump_stats(path)
+                record['cprofile'] = path
+            record.update(span.attrs)
+            self._emit(record)
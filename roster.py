@@ -0,0 +1,150 @@
+"""
+================================================================================
+COMPACT ROSTERS - EMPLOYEES AS PARALLEL ARRAYS
+================================================================================
+
+A Roster holds one team's employees as a struct of arrays instead of a
+DataFrame: each name is interned once (an int32 id per employee into the
+table of distinct names) and every other field keeps the dtype ingest.py
+pinned, float32 for hours, scores and counts, float64 for the derived
+TotalWorkHrs and ProdToQCRatio. Nothing else is widened to float64 up front.
+
+The builders, scoring.py, incremental.py and history.py read rosters by
+column name, len() and .columns, and a Roster answers all three, so it is
+passed to them in place of a DataFrame. A float32 column is widened to
+float64 through its shortest decimal form (ingest.widen) each time it is
+read, which gives the sheets and scores exactly the values widen_floats
+would, while only one column is ever widened at a time.
+
+Excel_Maker.py, shards.py and service.py all hold the rosters they load as
+Rosters. Memory per employee with 1,000,000 employees per team, names
+included, loaded from CSV (benchmarks/roster_memory.py):
+
+                        QC      Production   peak RSS
+    widened DataFrame   118 B   128 B        722 MB
+    Roster              56 B    62 B         556 MB
+
+Usage:
+    prod_data = Roster.from_frame(load_prod("prod_export.csv", grades="grades.csv"))
+    build_workbook("evaluation.xlsx", qc_data, prod_data)
+"""
+
+import numpy as np
+import pandas as pd
+
+from ingest import widen
+
+
+class Roster:
+    """
+    Employees of one team as parallel arrays: `name_ids` into the distinct
+    `names`, and one array per field in `fields` (column name -> array).
+    """
+    __slots__ = ('name_ids', 'names', 'fields')
+
+    def __init__(self, name_ids, names, fields):
+        self.name_ids = np.asarray(name_ids, dtype=np.int32)
+        self.names = pd.Index(names)
+        self.fields = dict(fields)
+        for column, values in self.fields.items():
+            if len(values) != len(self.name_ids):
+                raise ValueError(f"{column}: {len(values)} values for {len(self.name_ids)} employees")
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        A Roster with `df`'s rows. Names are interned through their
+        categories (ingest.py loads Name as a category); every other column
+        keeps its dtype, with category columns staying categorical.
+        """
+        names = df['Name'].astype('category').array
+        fields = {}
+        for column in df.columns:
+            if column == 'Name':
+                continue
+            values = df[column]
+            fields[column] = values.array if isinstance(values.dtype, pd.CategoricalDtype) else values.to_numpy()
+        return cls(names.codes, names.categories, fields)
+
+    def __len__(self):
+        return len(self.name_ids)
+
+    def __repr__(self):
+        return f"<Roster: {len(self)} employees, {len(self.names)} names, columns {list(self.fields)}>"
+
+    @property
+    def columns(self):
+        return pd.Index(['Name'] + list(self.fields), dtype=object)
+
+    @property
+    def index(self):
+        return pd.RangeIndex(len(self))
+
+    def __getitem__(self, column):
+        """The column as a Series; float32 values arrive widened to float64."""
+        if column == 'Name':
+            return pd.Series(pd.Categorical.from_codes(self.name_ids, self.names), name='Name')
+        values = self.fields[column]
+        if values.dtype == np.float32:
+            values = widen(values)
+        return pd.Series(values, name=column, copy=False)
+
+    def take(self, rows):
+        """
+        A Roster of the employees at positions `rows`. The name table and
+        category columns keep only the values those employees use, so a
+        part of a large roster does not carry (or pickle) the whole tables.
+        """
+        ids = self.name_ids[rows]
+        used = np.unique(ids[ids >= 0])
+        name_ids = np.where(ids >= 0, np.searchsorted(used, ids), -1)
+        fields = {}
+        for column, values in self.fields.items():
+            values = values[rows]
+            if isinstance(values, pd.Categorical):
+                values = values.remove_unused_categories()
+            fields[column] = values
+        return Roster(name_ids, self.names[used], fields)
+
+    @property
+    def iloc(self):
+        """Row slicing as on a DataFrame (`roster.iloc[start:stop]`); the arrays are views."""
+        return _RowSlicer(self)
+
+    def __contains__(self, column):
+        return column == 'Name' or column in self.fields
+
+    def assign(self, **columns):
+        """A Roster with `columns` added or replaced; the other arrays are shared."""
+        fields = dict(self.fields)
+        for column, values in columns.items():
+            if column == 'Name':
+                raise ValueError("names are interned; build a new Roster to rename employees")
+            fields[column] = values.to_numpy() if isinstance(values, pd.Series) else np.asarray(values)
+        return Roster(self.name_ids, self.names, fields)
+
+    def to_frame(self):
+        """The roster as a DataFrame, with float32 columns widened as on read."""
+        return pd.DataFrame({column: self[column] for column in self.columns})
+
+    @property
+    def nbytes(self):
+        """Bytes held by the arrays and the interned name table."""
+        total = self.name_ids.nbytes + self.names.memory_usage(deep=True)
+        for values in self.fields.values():
+            total += values.memory_usage(deep=True) if hasattr(values, 'memory_usage') else values.nbytes
+        return total
+
+
+class _RowSlicer:
+    __slots__ = ('roster',)
+
+    def __init__(self, roster):
+        self.roster = roster
+
+    def __getitem__(self, rows):
+        if not isinstance(rows, slice):
+            raise TypeError("a Roster is sliced by row ranges only")
+        roster = self.roster
+        return Roster(roster.name_ids[rows], roster.names,
+                      {column: values[rows] for column, values in roster.fields.items()})
@@ -0,0 +1,305 @@
+"""
+================================================================================
+METRIC SCHEMA - DECLARATIVE TEAM DEFINITIONS AND COMPILED FORMULA TEMPLATES
+================================================================================
+
+Each team is declared once as a list of metrics: source column, labels,
+default weight, direction and normalization rule. Everything else derives
+from that declaration:
+
+    layout()           column letters of every block on the team's sheet
+    compile_formulas() FINAL SCORE / RANK / helper formulas as row templates
+    scoring.py         the same normalization in NumPy
+
+Compiled templates are cached per metric shape (direction, normalization,
+scale), headcount and options, at most FORMULA_CACHE_SIZE of them, and
+pre-split at their row placeholders, so emitting a data row is one str.join
+per formula instead of assembling every range again.
+
+Adding a team means declaring another Team with its metrics; builder.py lays
+out its sheet from the declaration.
+"""
+
+from dataclasses import dataclass, replace
+from functools import lru_cache
+
+from openpyxl.utils import get_column_letter
+
+EPSILON = 0.0001
+DEFAULT_LEAVE_THRESHOLD = 50
+FIRST_DATA_ROW = 9
+
+# Compiled formula sets kept (one per metric shape, headcount and options)
+FORMULA_CACHE_SIZE = 64
+
+# Directions
+HIGHER = 'higher'  # larger raw values score better
+LOWER = 'lower'    # smaller raw values score better
+
+# Normalization rules
+MINMAX = 'minmax'        # (x - MIN) / (MAX - MIN + 0.0001), flipped for LOWER
+THRESHOLD = 'threshold'  # 1 - MAX(x - T, 0) / (MAX(x - T) + 0.0001), T = team's leave threshold
+
+
+@dataclass(frozen=True)
+class Metric:
+    """One scored column of a team's sheet."""
+    column: str          # source DataFrame column
+    header: str          # data header in row 8
+    weight_header: str   # weight header in row 5
+    label: str           # name in the instructions sheet
+    weight: float        # default weight (%)
+    direction: str = HIGHER
+    normalization: str = MINMAX
+    scale: float = 1     # raw values are divided by this before normalizing
+
+    def __post_init__(self):
+        if self.direction not in (HIGHER, LOWER):
+            raise ValueError(f"{self.column}: unknown direction {self.direction!r}")
+        if self.normalization not in (MINMAX, THRESHOLD):
+            raise ValueError(f"{self.column}: unknown normalization {self.normalization!r}")
+        if self.normalization == THRESHOLD and (self.direction != LOWER or self.scale != 1):
+            raise ValueError(f"{self.column}: threshold penalties apply to unscaled, "
+                             f"lower-is-better metrics")
+
+
+@dataclass(frozen=True)
+class Team:
+    """A team sheet: its title, labels and metrics in weight-row order."""
+    sheet: str
+    title: str
+    name: str            # e.g. "QC Team", used in progress messages
+    short: str           # e.g. "QC", used in the instructions
+    staff: str           # e.g. "QC employees"
+    metrics: tuple
+    leave_threshold: float = DEFAULT_LEAVE_THRESHOLD
+    metric_width: float = 14
+
+    @property
+    def columns(self):
+        return [metric.column for metric in self.metrics]
+
+    @property
+    def weights(self):
+        return [metric.weight for metric in self.metrics]
+
+
+# Leave hours are penalized only above the sheet's leave threshold
+LEAVE = Metric('LeaveH', 'Leave (H)', 'Leave %', 'Leave', 10, direction=LOWER, normalization=THRESHOLD)
+
+
+QC_TEAM = Team(
+    sheet="QC_Team_Evaluation",
+    title="QC TEAM PERFORMANCE EVALUATION - CUSTOMIZABLE",
+    name="QC Team",
+    short="QC",
+    staff="QC employees",
+    metrics=(
+        Metric('TotalWorkHrs', 'Total Work Hrs', 'Total Work Hrs %', 'Total Work Hours', 50),
+        LEAVE,
+        Metric('DistinctTasks', 'Distinct Tasks', 'Distinct Tasks %', 'Distinct Tasks', 15),
+        Metric('ProjectsWorked', 'Projects', 'Projects %', 'Projects', 5),
+        Metric('TotalTasks', 'Total Tasks', 'Total Tasks %', 'Total Tasks', 5),
+        Metric('TLScore', 'TL Score', 'TL Score %', 'TL Score', 15),
+    ),
+    metric_width=14,
+)
+
+PROD_TEAM = Team(
+    sheet="Production_Evaluation",
+    title="PRODUCTION HAND PERFORMANCE EVALUATION - CUSTOMIZABLE",
+    name="Production Hand",
+    short="Production",
+    staff="Production Hand employees",
+    metrics=(
+        Metric('ProductionH', 'Production (H)', 'Production %', 'Production Hours', 50),
+        LEAVE,
+        Metric('ProdToQCRatio', 'Prod/QC Ratio', 'Prod/QC %', 'Prod/QC Ratio', 20),
+        Metric('DistinctTasks', 'Distinct Tasks', 'Distinct %', 'Distinct Tasks', 5),
+        Metric('ProjectsWorked', 'Projects', 'Projects %', 'Projects', 3),
+        Metric('TotalTasks', 'Total Tasks', 'Tasks %', 'Total Tasks', 2),
+        Metric('AvgEvaluation', 'Avg Eval (/10)', 'Avg Eval %', 'Avg Evaluation', 5, scale=10),
+        Metric('Consistency', 'Consistency', 'Consistency %', 'Consistency', 5),
+    ),
+    metric_width=13,
+)
+
+TEAMS = (QC_TEAM, PROD_TEAM)
+
+
+def team_for_columns(columns):
+    """The first declared team whose metric columns are all in `columns`."""
+    columns = set(columns)
+    for team in TEAMS:
+        if columns.issuperset(team.columns):
+            return team
+    raise ValueError("data has the metric columns of no declared team ("
+                     + "; ".join(f"{team.short}: {', '.join(team.columns)}" for team in TEAMS) + ")")
+
+
+def metric_named(column):
+    """The declaration of a metric column, looked up across all teams."""
+    for team in TEAMS:
+        for metric in team.metrics:
+            if metric.column == column:
+                return metric
+    raise KeyError(f"no team declares a metric column {column!r}")
+
+
+# ============================================================================
+# COMPILED LAYOUT AND FORMULAS
+# ============================================================================
+
+@dataclass(frozen=True)
+class Layout:
+    """
+    Column letters of a team sheet. With n metrics: Name in A, metrics in
+    B.., then FINAL SCORE, RANK, the leave threshold label and cell and a
+    spacer; the hidden statistics block starts two columns later and the
+    hidden rank helpers two columns after that.
+    """
+    data: tuple          # one letter per metric
+    score: str
+    rank: str
+    weights: tuple       # weight cell letters in row 6 (A..)
+    total: str           # TOTAL % column in row 6
+    status: str
+    threshold_label: str
+    threshold: str       # leave threshold column in row 5
+    last: str            # last visible column (title merges end here)
+    stats_label: str
+    stats: tuple         # one hidden MIN / MAX / SPAN column per metric
+    sorted_scores: str
+    group_rank: str
+
+
+def layout(team):
+    """The column letters of `team`'s sheet; they depend only on its metric count."""
+    return _layout(len(team.metrics))
+
+
+@lru_cache(maxsize=None)
+def _layout(n):
+    letter = get_column_letter
+    return Layout(
+        data=tuple(letter(2 + i) for i in range(n)),
+        score=letter(n + 2),
+        rank=letter(n + 3),
+        weights=tuple(letter(1 + i) for i in range(n)),
+        total=letter(n + 1),
+        status=letter(n + 2),
+        threshold_label=letter(n + 4),
+        threshold=letter(n + 5),
+        last=letter(n + 6),
+        stats_label=letter(n + 8),
+        stats=tuple(letter(n + 9 + i) for i in range(n)),
+        sorted_scores=letter(2 * n + 10),
+        group_rank=letter(2 * n + 11),
+    )
+
+
+class RowTemplate:
+    """A formula with `{r}` row placeholders, split once so filling it is a str.join."""
+    __slots__ = ('text', '_pieces')
+
+    def __init__(self, text):
+        self.text = text
+        self._pieces = text.split('{r}')
+
+    def __call__(self, r):
+        return str(r).join(self._pieces)
+
+    def __repr__(self):
+        return f'RowTemplate({self.text!r})'
+
+
+@dataclass(frozen=True)
+class Formulas:
+    """
+    Formulas of one team sheet for a fixed headcount. `score` and `rank` are
+    RowTemplates; `group_rank` is formatted with `r` (the row) and `p` (the
+    previous row).
+    """
+    end_row: int
+    score: RowTemplate
+    rank: RowTemplate
+    stats: tuple         # (coordinate, formula) pairs of the statistics block
+    sort_range: str = None
+    sort: str = None
+    group_rank: str = None
+
+
+def _term(metric, col, weight_cell, threshold, end_row, stat=None):
+    """One weighted, normalized metric term of the FINAL SCORE formula."""
+    rng = f'{col}${FIRST_DATA_ROW}:{col}${end_row}'
+    scale = '' if metric.scale == 1 else f'/{metric.scale:g}'
+    x = f'{col}{{r}}{scale}'
+    weight = f'(${weight_cell}$6/100)'
+
+    if metric.normalization == THRESHOLD:
+        span = f'{stat}$7' if stat else f'(MAX({rng}-{threshold})+{EPSILON})'
+        return f'(1-MAX({x}-{threshold},0)/{span})*{weight}'
+
+    if stat:
+        lo, hi, span = f'{stat}$5', f'{stat}$6', f'{stat}$7'
+    else:
+        # Scale after MIN/MAX: MIN(H9:H20/10) would count blank cells as 0
+        lo, hi = f'MIN({rng}){scale}', f'MAX({rng}){scale}'
+        span = f'({hi}-{lo}+{EPSILON})'
+    if metric.direction == LOWER:
+        return f'(({hi}-{x})/{span})*{weight}'
+    return f'(({x}-{lo})/{span})*{weight}'
+
+
+def _shape(metric):
+    """The parts of a metric its formula terms depend on; labels and weight are blanked."""
+    return replace(metric, column='', header='', weight_header='', label='', weight=0)
+
+
+def compile_formulas(team, n_rows, hoist_column_stats=False, sorted_rank_helper=False):
+    """
+    The formula templates of `team`'s sheet for `n_rows` employees. Weights
+    and the leave threshold are cell references, so teams that differ only
+    in those (e.g. the service's scenarios) share one compiled entry.
+    """
+    metrics = tuple(_shape(metric) for metric in team.metrics)
+    return _compile_formulas(metrics, n_rows, hoist_column_stats, sorted_rank_helper)
+
+
+@lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def _compile_formulas(metrics, n_rows, hoist_column_stats, sorted_rank_helper):
+    lay = _layout(len(metrics))
+    end_row = FIRST_DATA_ROW + n_rows - 1
+    threshold = f'${lay.threshold}$5'
+
+    stats = []
+    if hoist_column_stats:
+        for metric, col, stat in zip(metrics, lay.data, lay.stats):
+            rng = f'{col}${FIRST_DATA_ROW}:{col}${end_row}'
+            scale = '' if metric.scale == 1 else f'/{metric.scale:g}'
+            stats.append((f'{stat}5', f'=MIN({rng}){scale}'))
+            stats.append((f'{stat}6', f'=MAX({rng}){scale}'))
+            if metric.normalization == THRESHOLD:
+                # Leave penalty span: largest excess over the threshold
+                stats.append((f'{stat}7', f'={stat}6-{threshold}+{EPSILON}'))
+            else:
+                stats.append((f'{stat}7', f'={stat}6-{stat}5+{EPSILON}'))
+
+    terms = [_term(metric, col, weight_cell, threshold, end_row, stat if hoist_column_stats else None)
+             for metric, col, weight_cell, stat in zip(metrics, lay.data, lay.weights, lay.stats)]
+    score = RowTemplate(f'=20*({" + ".join(terms)})')
+
+    s, v, w = lay.score, lay.sorted_scores, lay.group_rank
+    if not sorted_rank_helper:
+        rank = RowTemplate(f'=RANK({s}{{r}},{s}${FIRST_DATA_ROW}:{s}${end_row},0)')
+        return Formulas(end_row, score, rank, tuple(stats))
+
+    # Any position MATCH lands on within a tie group carries the same rank
+    rank = RowTemplate(f'=INDEX(${w}${FIRST_DATA_ROW}:${w}${end_row},'
+                       f'MATCH({s}{{r}},${v}${FIRST_DATA_ROW}:${v}${end_row},-1))')
+    return Formulas(
+        end_row, score, rank, tuple(stats),
+        sort_range=f'{v}{FIRST_DATA_ROW}:{v}{end_row}',
+        sort=f'=_xlfn._xlws.SORT({s}{FIRST_DATA_ROW}:{s}{end_row},1,-1)',
+        group_rank=f'=IF({v}{{r}}={v}{{p}},{w}{{p}},ROW()-{FIRST_DATA_ROW - 1})',
+    )
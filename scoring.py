@@ -0,0 +1,157 @@
+"""
+================================================================================
+VECTORIZED SCORING ENGINE - MIRRORS THE EXCEL FORMULAS
+================================================================================
+
+Computes FINAL SCORE (/20) and RANK for the QC and Production Hand teams with
+column-wise NumPy operations, reproducing the formulas that builder.py
+compiles from the same schema.py declarations:
+
+    higher-is-better : (x - MIN) / (MAX - MIN + 0.0001)
+    lower-is-better  : (MAX - x) / (MAX - MIN + 0.0001)
+    threshold (leave): 1 - MAX(x - T, 0) / (MAX(x - T) + 0.0001)
+    final score      : 20 * SUM(normalized * weight / 100)
+    rank             : RANK(score, scores, 0)  (descending, ties share a rank)
+
+Metrics may be given as schema.Metric declarations or as column names, which
+resolve to their declaration in the built-in teams.
+"""
+
+import numpy as np
+import pandas as pd
+
+from schema import (DEFAULT_LEAVE_THRESHOLD, EPSILON, LOWER, PROD_TEAM, QC_TEAM, TEAMS, THRESHOLD,
+                    Metric, metric_named, team_for_columns)
+
+# Metric columns in the same order as the weight cells in row 6
+QC_METRICS = QC_TEAM.columns
+PROD_METRICS = PROD_TEAM.columns
+
+DEFAULT_WEIGHTS_QC = QC_TEAM.weights
+DEFAULT_WEIGHTS_PROD = PROD_TEAM.weights
+
+
+def team_metrics(df):
+    """Return the metric column list for a QC or Production DataFrame."""
+    return team_for_columns(df.columns).columns
+
+
+def _definition(metric):
+    return metric if isinstance(metric, Metric) else metric_named(metric)
+
+
+def _column(metric):
+    return metric.column if isinstance(metric, Metric) else metric
+
+
+def _scaled(values, metric):
+    values = np.asarray(values, dtype=np.float64)
+    if metric.scale != 1:
+        values = values / metric.scale
+    return values
+
+
+def column_stats(values, metric, leave_threshold=DEFAULT_LEAVE_THRESHOLD):
+    """
+    Return (MIN, MAX, SPAN) for one metric column.
+
+    SPAN is the normalization denominator: MAX - MIN + 0.0001, or for leave
+    hours the largest excess over the threshold, MAX - T + 0.0001. These are
+    the values of the hidden statistics block when HOIST_COLUMN_STATS is on.
+    """
+    metric = _definition(metric)
+    values = _scaled(values, metric)
+    # Like Excel, MIN/MAX skip blank cells, and give 0 when every cell is blank
+    present = values[np.isfinite(values)]
+    if not len(present):
+        lo = hi = 0.0
+    else:
+        lo = float(present.min())
+        hi = float(present.max())
+    if metric.normalization == THRESHOLD:
+        return lo, hi, hi - leave_threshold + EPSILON
+    return lo, hi, hi - lo + EPSILON
+
+
+def normalize(values, metric, leave_threshold=DEFAULT_LEAVE_THRESHOLD):
+    """Normalize one metric column to the 0-1 scale used by the workbook."""
+    metric = _definition(metric)
+    lo, hi, span = column_stats(values, metric, leave_threshold)
+    # Blank cells count as 0 in the per-row formula; the workbook writers
+    # leave non-finite values blank too
+    values = _scaled(values, metric)
+    values = np.where(np.isfinite(values), values, 0.0)
+
+    if metric.normalization == THRESHOLD:
+        return 1 - np.maximum(values - leave_threshold, 0) / span
+    if metric.direction == LOWER:
+        return (hi - values) / span
+    return (values - lo) / span
+
+
+def rank_descending(scores):
+    """
+    Excel RANK(..., 0): 1 + number of strictly greater scores.
+
+    A 2-D array is ranked column by column (one column per scenario).
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n = scores.shape[0]
+    if n == 0:
+        return np.zeros(scores.shape, dtype=np.int64)
+    order = np.argsort(-scores, axis=0)
+    ordered = np.take_along_axis(scores, order, axis=0)
+
+    # Each run of tied scores takes the position of its first member
+    positions = np.arange(n).reshape((n,) + (1,) * (scores.ndim - 1))
+    tie_start = np.empty(scores.shape, dtype=bool)
+    tie_start[0] = True
+    tie_start[1:] = ordered[1:] != ordered[:-1]
+    first = np.maximum.accumulate(np.where(tie_start, positions, 0), axis=0)
+
+    ranks = np.empty(scores.shape, dtype=np.int64)
+    np.put_along_axis(ranks, order, first + 1, axis=0)
+    return ranks
+
+
+def final_scores(df, weights, leave_threshold=DEFAULT_LEAVE_THRESHOLD, metrics=None):
+    """FINAL SCORE (/20) for every row of `df` as a float64 array."""
+    if metrics is None:
+        metrics = team_metrics(df)
+    if len(weights) != len(metrics):
+        raise ValueError(f"Expected {len(metrics)} weights, got {len(weights)}")
+
+    total = np.zeros(len(df), dtype=np.float64)
+    for metric, weight in zip(metrics, weights):
+        total += normalize(df[_column(metric)].to_numpy(), metric, leave_threshold) * (weight / 100)
+    return 20 * total
+
+
+def _default_weights(metrics):
+    columns = [_column(metric) for metric in metrics]
+    for team in TEAMS:
+        if team.columns == columns:
+            return team.weights
+    raise ValueError(f"no team declares the metrics {columns}; pass weights explicitly")
+
+
+def score(df, weights=None, leave_threshold=DEFAULT_LEAVE_THRESHOLD, metrics=None):
+    """
+    Score a `qc_data` or `prod_data` DataFrame.
+
+    Returns a DataFrame with Name, FinalScore and Rank aligned to `df.index`.
+    `weights` are percentages in row-6 order; they default to the template's
+    default weights for the detected team.
+    """
+    if metrics is None:
+        metrics = team_metrics(df)
+    if weights is None:
+        weights = _default_weights(metrics)
+
+    scores = final_scores(df, weights, leave_threshold, metrics)
+    return pd.DataFrame({
+        # Categorical names stay categorical: no string object per employee
+        'Name': df['Name'].array,
+        'FinalScore': scores,
+        'Rank': rank_descending(scores),
+    }, index=df.index)
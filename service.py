@@ -0,0 +1,422 @@
+"""
+================================================================================
+EVALUATION SERVICE - SCORES AND WORKBOOKS FOR CUSTOM WEIGHTS OVER HTTP
+================================================================================
+
+A small asyncio HTTP server for ad-hoc evaluations. Rosters are QC or
+Production exports in a data directory (CSV, Excel or Parquet), loaded the
+way Excel_Maker.py loads --qc / --prod; a request names one of them and gives
+the weights and leave threshold to use.
+
+    GET  /health      {"status": "ok"}
+    GET  /datasets    roster files available in the data directory
+    POST /scores      JSON FinalScore and Rank per employee
+    POST /workbook    the evaluation workbook (.xlsx) with those weights
+
+Request body (JSON):
+    {"dataset": "prod_export.csv",
+     "weights": {"ProductionH": 60, "LeaveH": 10, ...},   or a list in row-6 order
+     "leave_threshold": 40,
+     "options": {"hoist_column_stats": true}}               /workbook only
+
+Weights missing from a dict keep the template default; "team" ("QC" or
+"Production"), when given, must match the dataset's team.
+
+Scoring and workbook generation run in a process pool. Results are kept in
+an LRU cache keyed on the dataset's content hash, the team, the weights,
+the threshold and the workbook options, so a repeated scenario is answered
+without recomputing; identical requests in flight share one job. The
+X-Cache response header is "hit" or "miss".
+
+Usage:
+    python service.py --data-dir rosters/ --port 8080
+    curl -s localhost:8080/scores -d '{"dataset": "prod.csv", "leave_threshold": 40}'
+    curl -s localhost:8080/workbook -d '{"dataset": "qc.csv"}' -o evaluation.xlsx
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import hashlib
+import json
+import math
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from http import HTTPStatus
+
+from builder import build_team_workbook
+from Excel_Maker import CONSISTENCY_SCORES
+from ingest import load_roster
+from roster import Roster
+from schema import TEAMS, team_for_columns
+from scoring import score
+
+DATASET_EXTENSIONS = ('.csv', '.parquet', '.xlsx', '.xlsm')
+WORKBOOK_OPTIONS = ('hoist_column_stats', 'streaming_write', 'precompute_values', 'sorted_rank_helper')
+XLSX_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+MAX_BODY_BYTES = 1 << 20
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+class RequestError(Exception):
+    """A request the service cannot serve; reported to the client with `status`."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ============================================================================
+# WORKER JOBS (run in the process pool)
+# ============================================================================
+
+@lru_cache(maxsize=8)
+def _roster(path, digest):
+    """
+    The roster at `path`, with its derived columns (and, for Production,
+    Consistency from CONSISTENCY_SCORES); `digest` keys the cache, so an
+    edited file is read again.
+    """
+    return Roster.from_frame(load_roster(path, consistency=CONSISTENCY_SCORES))
+
+
+def _team_named(short):
+    return next(team for team in TEAMS if team.short == short)
+
+
+def detect_team(path, digest):
+    """Short names of the teams whose metric columns the roster has, best match first."""
+    columns = set(_roster(path, digest).columns)
+    found = [team.short for team in TEAMS if columns.issuperset(team.columns)]
+    if not found:
+        team_for_columns(columns)  # raises with the expected columns
+    return found
+
+
+def score_job(path, digest, team_short, weights, leave_threshold):
+    """FinalScore and Rank records for one scenario."""
+    df = _roster(path, digest)
+    result = score(df, list(weights), leave_threshold, _team_named(team_short).metrics)
+    return [
+        {'Name': str(name),
+         'FinalScore': None if math.isnan(final) else final,
+         'Rank': int(rank)}
+        for name, final, rank in zip(result['Name'], result['FinalScore'].tolist(), result['Rank'].tolist())
+    ]
+
+
+def scenario_team(team, weights, leave_threshold):
+    """`team` with its default weights and leave threshold replaced by a scenario's."""
+    metrics = tuple(dataclasses.replace(metric, weight=weight) for metric, weight in zip(team.metrics, weights))
+    return dataclasses.replace(team, metrics=metrics, leave_threshold=leave_threshold)
+
+
+def workbook_job(path, digest, team_short, weights, leave_threshold, options):
+    """The evaluation workbook of one scenario, as .xlsx bytes."""
+    df = _roster(path, digest)
+    team = scenario_team(_team_named(team_short), weights, leave_threshold)
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'evaluation.xlsx')
+        build_team_workbook(output, [(team, df)], verbose=False, **dict(options))
+        with open(output, 'rb') as f:
+            return f.read()
+
+
+# ============================================================================
+# RESULT CACHE
+# ============================================================================
+
+class ResultCache:
+    """
+    LRU cache of asyncio tasks. Storing the task rather than its result lets
+    concurrent identical requests await the same job; failed jobs are evicted.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._tasks = OrderedDict()
+
+    def __len__(self):
+        return len(self._tasks)
+
+    async def get(self, key, make_job):
+        """Return (result, hit) for `key`, starting `make_job()` on a miss."""
+        task = self._tasks.get(key)
+        hit = task is not None
+        if hit:
+            self._tasks.move_to_end(key)
+        else:
+            task = asyncio.ensure_future(make_job())
+            self._tasks[key] = task
+            while len(self._tasks) > self.maxsize:
+                self._tasks.popitem(last=False)
+        try:
+            return await asyncio.shield(task), hit
+        except Exception:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+            raise
+
+
+# ============================================================================
+# SERVICE
+# ============================================================================
+
+def file_digest(path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class EvaluationService:
+    """Request handling for one data directory, process pool and cache."""
+
+    def __init__(self, data_dir, processes=None, cache_size=128):
+        self.data_dir = os.path.abspath(data_dir)
+        self.pool = ProcessPoolExecutor(max_workers=processes)
+        self.cache = ResultCache(cache_size)
+        self._digests = {}   # path -> (mtime_ns, size, sha256)
+        self._teams = {}     # sha256 -> team short names
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def datasets(self):
+        return sorted(name for name in os.listdir(self.data_dir)
+                      if name.lower().endswith(DATASET_EXTENSIONS)
+                      and os.path.isfile(os.path.join(self.data_dir, name)))
+
+    def _dataset_path(self, name):
+        if not isinstance(name, str) or not name:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "'dataset' must name a file in the data directory")
+        path = os.path.realpath(os.path.join(self.data_dir, name))
+        if os.path.dirname(path) != os.path.realpath(self.data_dir) or not os.path.isfile(path):
+            raise RequestError(HTTPStatus.NOT_FOUND, f"no dataset {name!r}")
+        return path
+
+    async def _digest(self, path):
+        """Content hash of a dataset, recomputed only when the file changes."""
+        stat = os.stat(path)
+        known = self._digests.get(path)
+        if known and known[:2] == (stat.st_mtime_ns, stat.st_size):
+            return known[2]
+        digest = await asyncio.to_thread(file_digest, path)
+        self._digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    async def _run(self, job, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, job, *args)
+
+    async def scenario(self, body):
+        """Resolve a request body to (path, digest, team, weights, leave_threshold)."""
+        path = self._dataset_path(body.get('dataset'))
+        digest = await self._digest(path)
+        if digest not in self._teams:
+            try:
+                self._teams[digest] = await self._run(detect_team, path, digest)
+            except ValueError as exc:
+                raise RequestError(HTTPStatus.UNPROCESSABLE_ENTITY, str(exc)) from None
+
+        found = self._teams[digest]
+        short = body.get('team', found[0])
+        if short not in found:
+            raise RequestError(HTTPStatus.UNPROCESSABLE_ENTITY,
+                               f"dataset has the columns of {', '.join(found)}, not {short!r}")
+        team = _team_named(short)
+        weights = _weights(team, body.get('weights'))
+        leave_threshold = _number(body.get('leave_threshold', team.leave_threshold), 'leave_threshold')
+        return path, digest, team, weights, leave_threshold
+
+    async def scores(self, body):
+        path, digest, team, weights, leave_threshold = await self.scenario(body)
+        key = ('scores', digest, team.short, weights, leave_threshold)
+        records, hit = await self.cache.get(
+            key, lambda: self._run(score_job, path, digest, team.short, weights, leave_threshold))
+        return {
+            'dataset': body['dataset'],
+            'dataset_hash': digest,
+            'team': team.short,
+            'weights': dict(zip(team.columns, weights)),
+            'leave_threshold': leave_threshold,
+            'scores': records,
+        }, hit
+
+    async def workbook(self, body):
+        path, digest, team, weights, leave_threshold = await self.scenario(body)
+        options = body.get('options') or {}
+        if not isinstance(options, dict) or set(options) - set(WORKBOOK_OPTIONS):
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"'options' may set {', '.join(WORKBOOK_OPTIONS)}")
+        options = tuple((name, bool(options.get(name, False))) for name in WORKBOOK_OPTIONS)
+        key = ('workbook', digest, team.short, weights, leave_threshold, options)
+        return await self.cache.get(
+            key, lambda: self._run(workbook_job, path, digest, team.short, weights, leave_threshold, options))
+
+    # ------------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------------
+
+    async def handle(self, reader, writer):
+        """Serve one request per connection."""
+        try:
+            try:
+                method, target, body = await _read_request(reader)
+                await self.dispatch(writer, method, target, body)
+            except RequestError as exc:
+                await _send_json(writer, exc.status, {'error': str(exc)})
+            except Exception as exc:  # report, keep serving
+                await _send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR,
+                                 {'error': f"{type(exc).__name__}: {exc}"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, writer, method, target, body):
+        route = target.split('?', 1)[0].rstrip('/') or '/'
+        routes = {'/health': 'GET', '/datasets': 'GET', '/scores': 'POST', '/workbook': 'POST'}
+        if route not in routes:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"no route {route}")
+        if method != routes[route]:
+            raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, f"{route} expects {routes[route]}")
+
+        if route == '/health':
+            await _send_json(writer, HTTPStatus.OK, {'status': 'ok', 'cached_scenarios': len(self.cache)})
+        elif route == '/datasets':
+            await _send_json(writer, HTTPStatus.OK, {'datasets': self.datasets()})
+        elif route == '/scores':
+            result, hit = await self.scores(_json_body(body))
+            await _send_json(writer, HTTPStatus.OK, result, hit)
+        else:
+            request = _json_body(body)
+            data, hit = await self.workbook(request)
+            stem = os.path.splitext(os.path.basename(request['dataset']))[0]
+            await _send_bytes(writer, data, XLSX_TYPE, hit, f"Performance_Evaluation_{stem}.xlsx")
+
+
+def _number(value, field):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"{field!r} must be a finite number")
+    return float(value)
+
+
+def _weights(team, weights):
+    """Row-6 weight tuple from a request: None, a full list, or a partial {column: weight} dict."""
+    if weights is None:
+        return tuple(float(w) for w in team.weights)
+    if isinstance(weights, dict):
+        unknown = set(weights) - set(team.columns)
+        if unknown:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"unknown {team.short} metrics: {', '.join(sorted(unknown))}")
+        weights = [weights.get(metric.column, metric.weight) for metric in team.metrics]
+    elif not isinstance(weights, list) or len(weights) != len(team.metrics):
+        raise RequestError(HTTPStatus.BAD_REQUEST,
+                           f"'weights' must be an object or a list of {len(team.metrics)} numbers "
+                           f"({', '.join(team.columns)})")
+    return tuple(_number(w, 'weights') for w in weights)
+
+
+async def _read_request(reader):
+    """Return (method, target, body bytes) of one HTTP/1.1 request."""
+    request_line = await reader.readline()
+    if not request_line:
+        raise ConnectionError("client closed the connection")
+    try:
+        method, target, _ = request_line.decode('latin-1').split()
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "malformed request line") from None
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "malformed Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"body exceeds {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, body
+
+
+def _json_body(body):
+    try:
+        request = json.loads(body or b'{}')
+    except ValueError as exc:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"body is not JSON: {exc}") from None
+    if not isinstance(request, dict):
+        raise RequestError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+    return request
+
+
+def _send_head(writer, status, content_type, length, hit=None, filename=None):
+    status = HTTPStatus(status)
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}",
+             f"Content-Type: {content_type}",
+             f"Content-Length: {length}",
+             "Connection: close"]
+    if hit is not None:
+        lines.append(f"X-Cache: {'hit' if hit else 'miss'}")
+    if filename:
+        lines.append(f'Content-Disposition: attachment; filename="{filename}"')
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+
+async def _send_json(writer, status, payload, hit=None):
+    data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    _send_head(writer, status, 'application/json; charset=utf-8', len(data), hit)
+    writer.write(data)
+    await writer.drain()
+
+
+async def _send_bytes(writer, data, content_type, hit, filename):
+    """Send `data` in chunks, waiting for the client to drain each one."""
+    _send_head(writer, HTTPStatus.OK, content_type, len(data), hit, filename)
+    view = memoryview(data)
+    for start in range(0, len(view), STREAM_CHUNK_BYTES):
+        writer.write(view[start:start + STREAM_CHUNK_BYTES])
+        await writer.drain()
+
+
+async def serve(data_dir, host='127.0.0.1', port=8080, processes=None, cache_size=128):
+    """Run the service until cancelled."""
+    service = EvaluationService(data_dir, processes, cache_size)
+    server = await asyncio.start_server(service.handle, host, port)
+    address = server.sockets[0].getsockname()
+    print(f"✓ Serving {service.data_dir} on http://{address[0]}:{address[1]}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve evaluation scores and workbooks over HTTP.")
+    parser.add_argument('--data-dir', default='.', help="directory of roster files clients may name")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--cache-size', type=int, default=128, help="scenarios kept in the LRU cache")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.data_dir, args.host, args.port, args.processes, args.cache_size))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
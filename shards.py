@@ -0,0 +1,185 @@
+"""
+================================================================================
+SHARDED GENERATION - ONE WORKBOOK PER DEPARTMENT, BUILT IN PARALLEL
+================================================================================
+
+Splits the QC and Production rosters by a department / team column and builds
+one evaluation workbook per department, each with that department's QC and
+Production Hand sheets. Workbooks are built by builder.build_workbook in a
+process pool, largest departments first, and a manifest.json next to them
+lists every output file with its headcounts.
+
+Each worker only receives its own department's rows, so wall time is bounded
+by the number of cores and the largest department rather than total headcount.
+Employees with a blank department go to a shard of their own (department
+null in the manifest, "blank" in the file name).
+
+Usage:
+    python shards.py --qc qc_export.csv --prod prod_export.parquet --by Department -o shards/
+    python shards.py --prod prod_export.csv --grades grades.csv --by Team --hoist-column-stats
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from builder import build_workbook
+from Excel_Maker import CONSISTENCY_SCORES
+from ingest import load_prod, load_qc
+from roster import Roster
+
+MANIFEST_FILE = "manifest.json"
+BLANK_SHARD = "blank"
+
+
+def shard_file_name(department, taken):
+    """A file name for `department` that is safe on disk and unique within `taken`."""
+    if department is None:
+        department = BLANK_SHARD
+    stem = re.sub(r'[^A-Za-z0-9._-]+', '_', str(department)).strip('._') or 'shard'
+    name = f"Performance_Evaluation_{stem}.xlsx"
+    suffix = 2
+    while name.lower() in taken:
+        name = f"Performance_Evaluation_{stem}_{suffix}.xlsx"
+        suffix += 1
+    taken.add(name.lower())
+    return name
+
+
+def _rows(df, positions):
+    """`df`'s rows at `positions`, with names and category columns trimmed to the values used."""
+    if isinstance(df, Roster):
+        return df.take(positions)
+    rows = df.take(positions).reset_index(drop=True)
+    for col in rows.columns:
+        if isinstance(rows[col].dtype, pd.CategoricalDtype):
+            # Otherwise every shard would carry (and pickle) the full name list
+            rows[col] = rows[col].cat.remove_unused_categories()
+    return rows
+
+
+def _split(df, by):
+    """
+    Map department -> its rows (a Roster or DataFrame, like `df`), in order
+    of first appearance. Rows with a blank department are kept under None.
+    """
+    if df is None:
+        return {}
+    if by not in df.columns:
+        raise ValueError(f"roster has no {by!r} column to shard by")
+    codes, departments = pd.factorize(df[by], use_na_sentinel=False)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(1, len(departments)))
+    return {None if pd.isna(department) else department: _rows(df, positions)
+            for department, positions in zip(departments, np.split(order, bounds))}
+
+
+def split_rosters(qc_data, prod_data, by):
+    """
+    Group both rosters by the `by` column.
+
+    Returns (department, qc_rows, prod_rows) triples, largest department
+    first; a department missing from one roster gets None for it.
+    """
+    qc_shards = _split(qc_data, by)
+    prod_shards = _split(prod_data, by)
+    departments = list(qc_shards) + [d for d in prod_shards if d not in qc_shards]
+
+    def headcount(department):
+        return sum(len(shards.get(department, ())) for shards in (qc_shards, prod_shards))
+
+    departments.sort(key=headcount, reverse=True)
+    return [(department, qc_shards.get(department), prod_shards.get(department))
+            for department in departments]
+
+
+def _build_shard(path, qc_rows, prod_rows, options):
+    start = time.perf_counter()
+    build_workbook(path, qc_rows, prod_rows, verbose=False, **options)
+    return time.perf_counter() - start
+
+
+def build_shards(qc_data, prod_data, by, output_dir, processes=None, **options):
+    """
+    Build one workbook per department into `output_dir` and write the manifest.
+
+    `options` are passed to build_workbook (hoist_column_stats,
+    streaming_write, precompute_values, sorted_rank_helper, writer).
+    Returns the manifest as a dict.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    taken = set()
+    tasks = []
+    entries = []
+    for department, qc_rows, prod_rows in split_rosters(qc_data, prod_data, by):
+        name = shard_file_name(department, taken)
+        tasks.append((os.path.join(output_dir, name), qc_rows, prod_rows, options))
+        entries.append({
+            'department': department.item() if hasattr(department, 'item') else department,
+            'file': name,
+            'qc_employees': 0 if qc_rows is None else len(qc_rows),
+            'production_employees': 0 if prod_rows is None else len(prod_rows),
+        })
+
+    if processes == 1 or len(tasks) <= 1:
+        seconds = [_build_shard(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            seconds = list(pool.map(_build_shard, *zip(*tasks)))
+
+    for entry, elapsed in zip(entries, seconds):
+        entry['build_seconds'] = round(elapsed, 3)
+    manifest = {
+        'shard_column': by,
+        'options': options,
+        'shards': sorted(entries, key=lambda entry: str(entry['department'])),
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build one evaluation workbook per department.")
+    parser.add_argument('--qc', help="QC roster (CSV, Excel or Parquet)")
+    parser.add_argument('--prod', help="Production roster (CSV, Excel or Parquet)")
+    parser.add_argument('--grades', help="long (Name, Grade) history for Production Consistency")
+    parser.add_argument('--by', default='Department', help="column to shard by")
+    parser.add_argument('-o', '--output-dir', default='shards')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--hoist-column-stats', action='store_true')
+    parser.add_argument('--streaming-write', action='store_true')
+    parser.add_argument('--precompute-values', action='store_true')
+    parser.add_argument('--sorted-rank-helper', action='store_true')
+    parser.add_argument('--writer', choices=('openpyxl', 'xlsxwriter'), default='openpyxl',
+                        help="xlsx library that writes the workbooks (see writers.py)")
+    args = parser.parse_args(argv)
+    if not (args.qc or args.prod):
+        parser.error("give --qc, --prod or both")
+
+    qc_data = Roster.from_frame(load_qc(args.qc, extra_columns=[args.by])) if args.qc else None
+    prod_data = None
+    if args.prod:
+        prod_data = Roster.from_frame(load_prod(args.prod, grades=args.grades, consistency=CONSISTENCY_SCORES,
+                                                extra_columns=[args.by]))
+
+    start = time.perf_counter()
+    manifest = build_shards(qc_data, prod_data, args.by, args.output_dir, processes=args.processes,
+                            hoist_column_stats=args.hoist_column_stats,
+                            streaming_write=args.streaming_write,
+                            precompute_values=args.precompute_values,
+                            sorted_rank_helper=args.sorted_rank_helper,
+                            writer=args.writer)
+    elapsed = time.perf_counter() - start
+    print(f"✓ {len(manifest['shards'])} workbooks built in {elapsed:.1f}s: "
+          f"{os.path.join(args.output_dir, MANIFEST_FILE)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+================================================================================
+SHEET WRITER - SHARED STYLE PALETTE AND BULK ROW EMISSION
+================================================================================
+
+The style palette used by every evaluation sheet, registered once per
+workbook as NamedStyles, plus helpers that emit whole data rows at once.
+Cells reference a named style instead of receiving font, fill, border and
+alignment objects one by one. Each data column's style is resolved once per
+sheet into a style array; rows are then built from those arrays, so no
+per-cell style objects are created or looked up. The same row cells work
+for regular and write-only worksheets.
+"""
+
+from copy import copy
+
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.fonts import DEFAULT_FONT
+
+# Styles
+header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+header_font = Font(color="FFFFFF", bold=True, size=11)
+weight_fill = PatternFill(start_color="FFE699", end_color="FFE699", fill_type="solid")
+weight_font = Font(bold=True, size=11, color="C65911")
+data_fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
+result_fill = PatternFill(start_color="C6E0B4", end_color="C6E0B4", fill_type="solid")
+result_font = Font(bold=True, size=10)
+title_fill = PatternFill(start_color="203864", end_color="203864", fill_type="solid")
+title_font = Font(color="FFFFFF", bold=True, size=14)
+center = Alignment(horizontal="center", vertical="center")
+data_left = Alignment(horizontal="left")
+data_center = Alignment(horizontal="center")
+border = Border(left=Side(style='thin'), right=Side(style='thin'),
+                top=Side(style='thin'), bottom=Side(style='thin'))
+
+# Named styles (they show up in Excel's Cell Styles gallery)
+TITLE = "Eval Title"
+NOTE = "Eval Note"
+SECTION = "Eval Section"
+HEADER = "Eval Header"
+WEIGHT = "Eval Weight"
+TOTAL = "Eval Total"
+STATUS = "Eval Status"
+THRESHOLD_LABEL = "Eval Threshold Label"
+NAME = "Eval Name"
+VALUE = "Eval Value"
+SCORE = "Eval Score"
+RANK = "Eval Rank"
+GUIDE_TITLE = "Guide Title"
+GUIDE_SUBTITLE = "Guide Subtitle"
+GUIDE_SECTION = "Guide Section"
+
+NAMED_STYLES = {
+    TITLE: dict(font=title_font, fill=title_fill, alignment=center),
+    NOTE: dict(font=Font(italic=True, size=10, bold=True, color="C65911"), alignment=center),
+    SECTION: dict(font=Font(bold=True, size=11, color="203864"),
+                  fill=PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid"),
+                  alignment=center),
+    HEADER: dict(font=header_font, fill=header_fill, alignment=center, border=border),
+    WEIGHT: dict(font=weight_font, fill=weight_fill, alignment=center, border=border, number_format='0'),
+    TOTAL: dict(font=Font(bold=True, size=12),
+                fill=PatternFill(start_color="FFD966", end_color="FFD966", fill_type="solid"),
+                alignment=center, border=border, number_format='0'),
+    STATUS: dict(font=Font(bold=True, size=10), alignment=center, border=border),
+    THRESHOLD_LABEL: dict(font=Font(bold=True, size=10),
+                          alignment=Alignment(horizontal="right", vertical="center")),
+    NAME: dict(border=border, alignment=data_left),
+    VALUE: dict(border=border, alignment=data_center),
+    SCORE: dict(font=result_font, fill=result_fill, border=border, number_format='0.00'),
+    RANK: dict(font=result_font, fill=result_fill, alignment=center, border=border),
+    GUIDE_TITLE: dict(font=Font(bold=True, size=16, color="FFFFFF"), fill=title_fill),
+    GUIDE_SUBTITLE: dict(font=Font(bold=True, size=12, color="366092")),
+    GUIDE_SECTION: dict(font=Font(bold=True, size=12, color="203864"),
+                        fill=PatternFill(start_color="E7E6E6", end_color="E7E6E6", fill_type="solid")),
+}
+
+
+def register_styles(wb):
+    """
+    Add the palette to `wb` as NamedStyles, once. A NamedStyle binds to a
+    single workbook, so each workbook gets its own instances. Attributes a
+    style leaves unset keep the workbook defaults (Calibri 11, no border).
+    """
+    registered = set(wb.named_styles)
+    for name, attrs in NAMED_STYLES.items():
+        if name not in registered:
+            attrs = {'font': DEFAULT_FONT, 'border': DEFAULT_BORDER, **attrs}
+            wb.add_named_style(NamedStyle(name=name, **attrs))
+
+
+def stream_staged_sheet(staged_ws, out_ws):
+    """Copy column layout, merges and rows of a staged sheet into a write-only sheet."""
+    register_styles(out_ws.parent)
+    for key, dim in staged_ws.column_dimensions.items():
+        out_ws.column_dimensions[key].width = dim.width
+        out_ws.column_dimensions[key].hidden = dim.hidden
+    for merged in staged_ws.merged_cells.ranges:
+        out_ws.merged_cells.add(merged.coord)
+    for row in staged_ws.iter_rows():
+        out_row = []
+        for src in row:
+            cell = WriteOnlyCell(out_ws, value=src.value)
+            if src.has_style:
+                cell.style = src.style
+                cell.font = copy(src.font)
+                cell.fill = copy(src.fill)
+                cell.border = copy(src.border)
+                cell.alignment = copy(src.alignment)
+                cell.number_format = src.number_format
+            out_row.append(cell)
+        out_ws.append(out_row)
+
+
+def data_row_styles(out_ws):
+    """
+    Resolve the data-row styles once for `out_ws`'s workbook.
+
+    Returns style arrays for (Name, metric value, FINAL SCORE, RANK) cells.
+    """
+    register_styles(out_ws.parent)
+    arrays = []
+    for name in (NAME, VALUE, SCORE, RANK):
+        cell = WriteOnlyCell(out_ws)
+        cell.style = name
+        arrays.append(cell._style)
+    return tuple(arrays)
+
+
+def data_row_cells(out_ws, styles, values, score_formula, rank_formula):
+    """
+    Build one complete data row (Name, metric values, FINAL SCORE, RANK)
+    ready for `out_ws.append`. `styles` comes from data_row_styles().
+    """
+    name_style, value_style, score_style, rank_style = styles
+    n = len(values)
+    cells = [Cell(out_ws, column=1, value=values[0], style_array=name_style)]
+    cells.extend(Cell(out_ws, column=col, value=value, style_array=value_style)
+                 for col, value in enumerate(values[1:], start=2))
+    cells.append(Cell(out_ws, column=n + 1, value=score_formula, style_array=score_style))
+    cells.append(Cell(out_ws, column=n + 2, value=rank_formula, style_array=rank_style))
+    return cells
@@ -0,0 +1,301 @@
+"""
+================================================================================
+WEIGHT-SCENARIO SWEEP - RANKS UNDER MANY WEIGHTINGS AT ONCE
+================================================================================
+
+Scores every combination of weight vector and leave threshold for one team
+and writes two tables: the scenarios (Scenario number, the weights and
+LeaveThreshold, one row each) and the ranks in long format (Scenario, Name
+and Rank, one row per scenario and employee). Employees keep their own rows
+even when names repeat.
+
+Metric normalization does not depend on the weights, so it is computed once
+(only threshold metrics, the leave penalty, are renormalized per threshold);
+each worker then scores a block of scenarios with a handful of column-wise
+NumPy passes and ranks them together. Blocks are spread over a process pool
+and written as they arrive, so the long table is never held whole: 10,000
+scenarios for 5,000 employees need about 200 MB of int32 ranks, not a
+50M-row DataFrame.
+
+The roster is loaded with ingest.py like Excel_Maker.py --qc / --prod, so a
+raw QC or Production export works as is.
+
+Usage:
+    python sweep.py prod_export.csv --grid-step 10 --thresholds 40 50 60 -o ranks.parquet
+    python sweep.py qc_export.csv --weights scenarios.csv -o comparison.xlsx
+"""
+
+import argparse
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from Excel_Maker import CONSISTENCY_SCORES
+from ingest import load_roster
+from roster import Roster
+from schema import THRESHOLD, Metric, metric_named
+from scoring import DEFAULT_LEAVE_THRESHOLD, normalize, rank_descending, team_metrics
+
+# Upper bound on employees x scenarios scored by one task
+SCENARIO_BLOCK_CELLS = 2_000_000
+
+# Rows of an .xlsx sheet, header included
+EXCEL_MAX_ROWS = 1_048_576
+
+# Blocks scored ahead of the writer, per worker process
+BLOCKS_IN_FLIGHT = 2
+
+# Per-process state installed by _init_worker
+_worker = {}
+
+
+def weight_grid(n_metrics, step=5, total=100):
+    """All weight vectors of non-negative multiples of `step` that sum to `total`."""
+    if total % step:
+        raise ValueError(f"total ({total}) must be a multiple of step ({step})")
+    units = total // step
+    slots = units + n_metrics - 1
+
+    # Stars and bars: each choice of n_metrics - 1 dividers is one vector
+    vectors = []
+    for dividers in itertools.combinations(range(slots), n_metrics - 1):
+        bounds = (-1,) + dividers + (slots,)
+        vectors.append([(hi - lo - 1) * step for lo, hi in zip(bounds, bounds[1:])])
+    return np.array(vectors, dtype=np.float64).reshape(-1, n_metrics)
+
+
+def read_table(path):
+    """Read a CSV, Excel or Parquet file into a DataFrame."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet':
+        return pd.read_parquet(path)
+    if ext in ('.xlsx', '.xlsm', '.xls'):
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+
+def load_weight_vectors(path, metrics):
+    """
+    Load weight vectors (one per row) from a file.
+
+    Columns named after the metrics are picked in row-6 order; otherwise the
+    file must have exactly one column per metric, in row-6 order.
+    """
+    table = read_table(path)
+    if set(metrics) <= set(table.columns):
+        table = table[metrics]
+    elif table.shape[1] != len(metrics):
+        raise ValueError(f"{path}: expected columns {metrics} or {len(metrics)} weight columns, "
+                         f"got {list(table.columns)}")
+    return table.to_numpy(dtype=np.float64)
+
+
+def _init_worker(normalized, threshold_columns):
+    _worker['normalized'] = normalized
+    _worker['threshold_columns'] = threshold_columns
+
+
+def _score_block(leave_threshold, weights):
+    """Rank all employees under a block of weight vectors; returns (scenarios, employees)."""
+    normalized = _worker['normalized']
+    if _worker['threshold_columns']:
+        normalized = normalized.copy()
+        for index, metric, values in _worker['threshold_columns']:
+            normalized[:, index] = normalize(values, metric, leave_threshold)
+
+    # Same operation order as scoring.final_scores, so ranks and ties match
+    total = np.zeros((normalized.shape[0], len(weights)), dtype=np.float64)
+    for j in range(normalized.shape[1]):
+        total += normalized[:, j, None] * (weights[:, j] / 100)
+    return rank_descending(20 * total).T.astype(np.int32)
+
+
+def scenario_table(weight_vectors, leave_thresholds, metrics):
+    """
+    One row per scenario: Scenario (0-based), the metric weights and
+    LeaveThreshold, threshold-major as run_sweep() orders them.
+    """
+    columns = [metric.column if isinstance(metric, Metric) else metric for metric in metrics]
+    weight_vectors = np.asarray(weight_vectors, dtype=np.float64).reshape(-1, len(columns))
+    thresholds = np.asarray(leave_thresholds, dtype=np.float64)
+    table = pd.DataFrame(np.tile(weight_vectors, (len(thresholds), 1)), columns=columns)
+    table.insert(0, 'Scenario', np.arange(len(table), dtype=np.int32))
+    table['LeaveThreshold'] = np.repeat(thresholds, len(weight_vectors))
+    return table
+
+
+def iter_rank_blocks(df, weight_vectors, leave_thresholds=(DEFAULT_LEAVE_THRESHOLD,),
+                     processes=None, metrics=None):
+    """
+    Rank every employee of `df` under each (weights, threshold) scenario.
+
+    Yields (first scenario, ranks) in scenario order, `ranks` an int32 array
+    of shape (scenarios in the block, employees). Only a few blocks per
+    worker are scored ahead of the consumer. Metrics may be schema.Metric
+    declarations or column names.
+    """
+    if metrics is None:
+        metrics = team_metrics(df)
+    metrics = [metric if isinstance(metric, Metric) else metric_named(metric) for metric in metrics]
+    weight_vectors = np.asarray(weight_vectors, dtype=np.float64).reshape(-1, len(metrics))
+
+    # Threshold-normalized metrics depend on the scenario's leave threshold
+    threshold_columns = [(i, metric, df[metric.column].to_numpy(dtype=np.float64))
+                         for i, metric in enumerate(metrics) if metric.normalization == THRESHOLD]
+    normalized = np.column_stack([
+        np.zeros(len(df)) if metric.normalization == THRESHOLD else normalize(df[metric.column].to_numpy(), metric)
+        for metric in metrics
+    ]).reshape(len(df), len(metrics))
+
+    block = max(1, SCENARIO_BLOCK_CELLS // max(len(df), 1))
+    tasks = [(threshold, weight_vectors[i:i + block])
+             for threshold in leave_thresholds
+             for i in range(0, len(weight_vectors), block)]
+    firsts = np.cumsum([0] + [len(weights) for _, weights in tasks[:-1]])
+
+    init_args = (normalized, threshold_columns)
+    if processes == 1 or len(tasks) == 1:
+        _init_worker(*init_args)
+        for first, task in zip(firsts, tasks):
+            yield int(first), _score_block(*task)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=init_args) as pool:
+        ahead = BLOCKS_IN_FLIGHT * (processes or os.cpu_count() or 1)
+        pending = deque()
+        for first, task in zip(firsts, tasks):
+            pending.append((first, pool.submit(_score_block, *task)))
+            if len(pending) >= ahead:
+                first, future = pending.popleft()
+                yield int(first), future.result()
+        while pending:
+            first, future = pending.popleft()
+            yield int(first), future.result()
+
+
+def run_sweep(df, weight_vectors, leave_thresholds=(DEFAULT_LEAVE_THRESHOLD,),
+              processes=None, metrics=None):
+    """
+    Rank every employee of `df` under each (weights, threshold) scenario.
+
+    Returns (scenarios, ranks): the scenario_table() and an int32 rank
+    matrix with one row per scenario and one column per employee, in roster
+    order. main() streams iter_rank_blocks() to the output instead.
+    """
+    if metrics is None:
+        metrics = team_metrics(df)
+    scenarios = scenario_table(weight_vectors, leave_thresholds, metrics)
+    ranks = np.empty((len(scenarios), len(df)), dtype=np.int32)
+    for first, block in iter_rank_blocks(df, weight_vectors, leave_thresholds, processes, metrics):
+        ranks[first:first + len(block)] = block
+    return scenarios, ranks
+
+
+def long_ranks(first, ranks, names):
+    """A block of ranks as Scenario, Name and Rank rows, scenario-major."""
+    n_scenarios, n_employees = ranks.shape
+    return pd.DataFrame({
+        'Scenario': np.repeat(np.arange(first, first + n_scenarios, dtype=np.int32), n_employees),
+        'Name': pd.Categorical.from_codes(np.tile(names.codes, n_scenarios), names.categories),
+        'Rank': ranks.reshape(-1),
+    })
+
+
+def check_output_size(path, rows):
+    """Raise ValueError when `rows` table rows do not fit the output format."""
+    if os.path.splitext(path)[1].lower() not in ('.parquet', '.csv') and rows >= EXCEL_MAX_ROWS:
+        raise ValueError(f"{rows:,} scenario x employee rows do not fit an Excel sheet "
+                         f"({EXCEL_MAX_ROWS - 1:,} at most); write .parquet or .csv instead")
+
+
+def scenarios_path(path):
+    """Where the scenario table of a .parquet or .csv output goes: ranks.parquet -> ranks_scenarios.parquet."""
+    root, ext = os.path.splitext(path)
+    return f"{root}_scenarios{ext}"
+
+
+def write_comparison(path, scenarios, blocks, names):
+    """
+    Write the scenario table and the long ranks from `blocks` ((first
+    scenario, ranks) pairs, as iter_rank_blocks() yields them) one block at
+    a time. A .parquet or .csv output gets the ranks, with the scenarios in
+    scenarios_path(); an .xlsx output gets a Scenarios sheet and a
+    Scenario_Comparison sheet.
+    """
+    check_output_size(path, len(scenarios) * len(names))
+    names = pd.Categorical(names)
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        scenarios.to_parquet(scenarios_path(path), index=False)
+        writer = None
+        try:
+            for first, ranks in blocks:
+                table = pa.Table.from_pandas(long_ranks(first, ranks, names), preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    elif ext == '.csv':
+        scenarios.to_csv(scenarios_path(path), index=False)
+        pd.DataFrame(columns=['Scenario', 'Name', 'Rank']).to_csv(path, index=False)
+        for first, ranks in blocks:
+            long_ranks(first, ranks, names).to_csv(path, mode='a', header=False, index=False)
+    else:
+        # Bounded by check_output_size, so the sheet is small enough to hold
+        table = pd.concat([long_ranks(first, ranks, names) for first, ranks in blocks], ignore_index=True)
+        with pd.ExcelWriter(path) as writer:
+            scenarios.to_excel(writer, sheet_name='Scenarios', index=False)
+            table.to_excel(writer, sheet_name='Scenario_Comparison', index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank employees under many weight scenarios.")
+    parser.add_argument('data', help="QC or Production export (CSV, Excel or Parquet), "
+                                     "as for Excel_Maker.py --qc / --prod")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--weights', help="file of weight vectors, one per row")
+    source.add_argument('--grid-step', type=int, help="every weighting in steps of this many percent")
+    parser.add_argument('--grades', help="grade history for Production Consistency "
+                                         "(default: CONSISTENCY_SCORES)")
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[DEFAULT_LEAVE_THRESHOLD],
+                        help="leave thresholds to combine with each weight vector")
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('-o', '--output', default='Scenario_Comparison.parquet')
+    args = parser.parse_args(argv)
+
+    try:
+        df = Roster.from_frame(load_roster(args.data, grades=args.grades, consistency=CONSISTENCY_SCORES))
+    except (OSError, ValueError) as exc:
+        parser.error(f"{args.data}: {exc}")
+    metrics = team_metrics(df)
+    try:
+        if args.weights:
+            weights = load_weight_vectors(args.weights, metrics)
+        else:
+            weights = weight_grid(len(metrics), step=args.grid_step)
+        check_output_size(args.output, len(weights) * len(args.thresholds) * len(df))
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+
+    scenarios = scenario_table(weights, args.thresholds, metrics)
+    print(f"Scoring {len(scenarios)} scenarios for {len(df)} employees...")
+    blocks = iter_rank_blocks(df, weights, args.thresholds, processes=args.processes, metrics=metrics)
+    write_comparison(args.output, scenarios, blocks, df['Name'])
+    if os.path.splitext(args.output)[1].lower() in ('.parquet', '.csv'):
+        print(f"✓ Scenario comparison saved: {args.output} (scenarios: {scenarios_path(args.output)})")
+    else:
+        print(f"✓ Scenario comparison saved: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+import pytest
+
+from builder import iter_rows
+from Excel_Maker import sample_rosters
+from roster import Roster
+from schema import QC_TEAM
+
+
+@pytest.mark.parametrize('as_roster', [False, True], ids=['frame', 'roster'])
+def test_rows_are_the_same_across_chunk_boundaries(as_roster):
+    df = sample_rosters()[0]
+    columns = ['Name'] + QC_TEAM.columns
+    expected = list(zip(*(df[col].tolist() for col in columns)))
+    source = Roster.from_frame(df) if as_roster else df
+    for chunk in (1, 3, len(df), len(df) + 1):
+        assert list(iter_rows(source, columns, chunk)) == expected
@@ -0,0 +1,14 @@
+import os
+import stat
+
+from builder import build_workbook
+from Excel_Maker import sample_rosters
+
+
+def test_precomputed_workbook_keeps_the_umask_mode(tmp_path):
+    qc_data, prod_data = sample_rosters()
+    plain = os.fspath(tmp_path / 'plain.xlsx')
+    cached = os.fspath(tmp_path / 'cached.xlsx')
+    build_workbook(plain, qc_data, prod_data, verbose=False)
+    build_workbook(cached, qc_data, prod_data, precompute_values=True, verbose=False)
+    assert stat.S_IMODE(os.stat(cached).st_mode) == stat.S_IMODE(os.stat(plain).st_mode)
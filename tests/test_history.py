@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+from openpyxl import load_workbook
+
+from Excel_Maker import CONSISTENCY_SCORES, main, sample_rosters
+from history import GRADES, consistency_from_history, periods
+from schema import PROD_TEAM
+
+
+def consistency_column(path):
+    ws = load_workbook(path)[PROD_TEAM.sheet]
+    header = [cell.value for cell in ws[8]]
+    col = header.index('Consistency')
+    return {row[0]: row[col] for row in ws.iter_rows(min_row=9, values_only=True) if row[0]}
+
+
+def test_runs_without_grades_keep_consistency(tmp_path):
+    history, output = os.fspath(tmp_path / 'history'), os.fspath(tmp_path / 'evaluation.xlsx')
+    for period in ('2026-07', '2026-08', '2026-09'):
+        main(['--history', history, '--period', period, '-o', output])
+
+    assert periods(history, GRADES) == []
+    assert consistency_from_history(history).empty
+    names = sample_rosters()[1]['Name']
+    assert consistency_column(output) == {name: CONSISTENCY_SCORES[name] for name in names}
+
+
+def test_grades_are_stored_by_period(tmp_path):
+    names = sample_rosters()[1]['Name'].tolist()
+    rows = [f"{period},{name},{grade}" for period, grade in (('2026-07', 'A'), ('2026-08', 'A'), ('2026-09', 'B'))
+            for name in names]
+    grades = tmp_path / 'grades.csv'
+    grades.write_text("Period,Name,Grade\n" + "\n".join(rows) + "\n")
+    history, output = os.fspath(tmp_path / 'history'), os.fspath(tmp_path / 'evaluation.xlsx')
+    main(['--history', history, '--period', '2026-09', '--grades', os.fspath(grades), '-o', output])
+
+    assert periods(history, GRADES) == ['2026-07', '2026-08', '2026-09']
+    values = consistency_column(output)
+    np.testing.assert_allclose([values[name] for name in names], 2 / 3)
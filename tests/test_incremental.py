@@ -0,0 +1,47 @@
+import os
+import stat
+
+from builder import build_workbook
+from Excel_Maker import sample_rosters, update_workbook
+from ingest import load_prod, load_qc
+
+QC_CSV = """Name,LeaveH,ProductionH,QCworkH,DistinctTasks,ProjectsWorked,TotalTasks,TLScore
+Ana,40.5,589.1,196.5,15,37,42,14
+Ben,12,607.9,286.3,11,22,30,17
+Cy,0,0.1,0.2,9,12,25,15
+"""
+PROD_CSV = """Name,LeaveH,ProductionH,QCcheckingH,DistinctTasks,ProjectsWorked,TotalTasks,AvgEvaluation
+Di,10,575,98,16,20,58,7.141
+Ed,0,709.1,74.4,12,34,162,7.253
+Fay,20,1,3,8,14,40,6.5
+"""
+
+
+def load(tmp_path):
+    (tmp_path / 'qc.csv').write_text(QC_CSV)
+    (tmp_path / 'prod.csv').write_text(PROD_CSV)
+    return load_qc(os.fspath(tmp_path / 'qc.csv')), load_prod(os.fspath(tmp_path / 'prod.csv'), consistency={})
+
+
+def test_unchanged_rosters_after_a_full_build(tmp_path):
+    qc_data, prod_data = load(tmp_path)
+    path = os.fspath(tmp_path / 'evaluation.xlsx')
+    build_workbook(path, qc_data, prod_data, verbose=False)
+    before = os.stat(path).st_mtime_ns
+
+    summary = update_workbook(path, qc_data, prod_data)
+    assert [counts['changed'] for counts in summary.values()] == [0, 0]
+    assert os.stat(path).st_mtime_ns == before
+
+
+def test_patched_workbook_keeps_its_mode(tmp_path):
+    qc_data, prod_data = sample_rosters()
+    path = os.fspath(tmp_path / 'evaluation.xlsx')
+    build_workbook(path, qc_data, prod_data, verbose=False)
+    os.chmod(path, 0o644)
+
+    moved = qc_data.assign(LeaveH=qc_data['LeaveH'] + 1)
+    summary = update_workbook(path, moved, prod_data)
+    assert summary[next(iter(summary))]['changed'] == len(qc_data)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    assert update_workbook(path, moved, prod_data)[next(iter(summary))]['changed'] == 0
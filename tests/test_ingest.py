@@ -0,0 +1,45 @@
+import numpy as np
+
+from ingest import load_prod, load_qc
+
+QC_CSV = """Name,LeaveH,ProductionH,QCworkH,DistinctTasks,ProjectsWorked,TotalTasks,TLScore
+Ana,40.5,589.1,196.5,15,37,42,14
+Ben,12,607.9,286.3,11,22,,17
+"""
+PROD_CSV = """Name,LeaveH,ProductionH,QCcheckingH,DistinctTasks,ProjectsWorked,TotalTasks,AvgEvaluation
+Cy,10,575,98,16,20,58,7.141
+Di,0,709.1,74.4,,34,162,7.253
+Ed,0,612.5,0,12,30,150,6.9
+"""
+
+
+def test_blank_counts_load_as_nan(tmp_path):
+    qc_path, prod_path = tmp_path / 'qc.csv', tmp_path / 'prod.csv'
+    qc_path.write_text(QC_CSV)
+    prod_path.write_text(PROD_CSV)
+
+    qc_data = load_qc(str(qc_path), chunksize=1)
+    prod_data = load_prod(str(prod_path), chunksize=1)
+    assert qc_data['TotalTasks'].tolist()[0] == 42 and np.isnan(qc_data['TotalTasks'].iloc[1])
+    assert np.isnan(prod_data['DistinctTasks'].iloc[1])
+
+
+def test_derived_columns_match_manual_entry(tmp_path):
+    qc_path, prod_path = tmp_path / 'qc.csv', tmp_path / 'prod.csv'
+    qc_path.write_text(QC_CSV)
+    prod_path.write_text(PROD_CSV)
+
+    qc_data = load_qc(str(qc_path))
+    prod_data = load_prod(str(prod_path))
+    assert qc_data['TotalWorkHrs'].dtype == np.float64
+    assert qc_data['TotalWorkHrs'].tolist() == [589.1 + 196.5, 607.9 + 286.3]
+    assert prod_data['ProdToQCRatio'].dtype == np.float64
+    assert prod_data['ProdToQCRatio'].tolist()[:2] == [575 / 98, 709.1 / 74.4]
+
+
+def test_no_qc_hours_gives_a_blank_ratio(tmp_path):
+    prod_path = tmp_path / 'prod.csv'
+    prod_path.write_text(PROD_CSV)
+
+    ratio = load_prod(str(prod_path))['ProdToQCRatio']
+    assert np.isnan(ratio.iloc[2])
@@ -0,0 +1,33 @@
+import pytest
+
+from Excel_Maker import load_rosters
+from profiling import Profiler
+
+QC_CSV = """Name,LeaveH,ProductionH,QCworkH,DistinctTasks,ProjectsWorked,TotalTasks,TLScore
+Ana,40.5,589.1,196.5,15,37,42,14
+"""
+PROD_CSV = """Name,LeaveH,ProductionH,QCcheckingH,DistinctTasks,ProjectsWorked,TotalTasks,AvgEvaluation
+Cy,10,575,98,16,20,58,7.141
+"""
+
+
+@pytest.mark.parametrize('given, sample_teams', [
+    (('qc', 'prod'), None),
+    (('qc',), ['prod']),
+    ((), ['qc', 'prod']),
+], ids=['both-sources', 'qc-source', 'no-sources'])
+def test_only_missing_sources_derive_the_sample(tmp_path, given, sample_teams):
+    paths = {'qc': tmp_path / 'qc.csv', 'prod': tmp_path / 'prod.csv'}
+    paths['qc'].write_text(QC_CSV)
+    paths['prod'].write_text(PROD_CSV)
+    sources = [str(paths[team]) if team in given else None for team in ('qc', 'prod')]
+
+    profiler = Profiler()
+    qc_data, prod_data = load_rosters(*sources, profiler=profiler)
+    samples = [record for record in profiler.records if record['span'] == 'derive:sample']
+    if sample_teams is None:
+        assert samples == []
+    else:
+        assert [record['teams'] for record in samples] == [sample_teams]
+    assert (len(qc_data) == 1) == ('qc' in given)
+    assert (len(prod_data) == 1) == ('prod' in given)
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from Excel_Maker import sample_rosters
+from ingest import load_qc, widen_floats
+from roster import Roster
+
+EMPLOYEES = 200_000
+# Bytes per QC employee, names included, as roster.py documents for 1M
+# employees loaded from CSV; the widened DataFrame takes about twice that
+QC_BYTES_PER_EMPLOYEE = 56
+
+
+def test_take_trims_names_and_categories():
+    qc_data = sample_rosters()[0]
+    qc_data['Department'] = pd.Categorical(np.where(np.arange(len(qc_data)) % 2, 'B', 'A'))
+    roster = Roster.from_frame(qc_data)
+    part = roster.take(np.array([1, 3]))
+    assert part['Name'].tolist() == qc_data['Name'].iloc[[1, 3]].tolist()
+    assert len(part.names) == 2
+    assert list(part.fields['Department'].categories) == ['B']
+    assert part['TotalWorkHrs'].tolist() == qc_data['TotalWorkHrs'].iloc[[1, 3]].tolist()
+
+
+def test_loaded_roster_holds_the_documented_bytes_per_employee(tmp_path):
+    rng = np.random.default_rng(0)
+    path = tmp_path / 'qc.csv'
+    pd.DataFrame({
+        'Name': [f"QC{i}" for i in range(EMPLOYEES)],
+        'LeaveH': rng.uniform(0, 150, EMPLOYEES).round(1),
+        'ProductionH': rng.uniform(350, 800, EMPLOYEES).round(1),
+        'QCworkH': rng.uniform(150, 350, EMPLOYEES).round(1),
+        'DistinctTasks': rng.integers(5, 20, EMPLOYEES),
+        'ProjectsWorked': rng.integers(15, 40, EMPLOYEES),
+        'TotalTasks': rng.integers(30, 200, EMPLOYEES),
+        'TLScore': rng.integers(10, 21, EMPLOYEES),
+    }).to_csv(path, index=False)
+
+    df = load_qc(os.fspath(path))
+    roster = Roster.from_frame(df)
+    widened = int(widen_floats(df).memory_usage(index=True, deep=True).sum())
+    assert roster.nbytes / EMPLOYEES <= QC_BYTES_PER_EMPLOYEE
+    assert roster.nbytes < widened / 1.8
@@ -0,0 +1,78 @@
+"""
+scoring.score against the workbook itself: the generated sheets are
+evaluated with the `formulas` library and FINAL SCORE and RANK must match.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from builder import build_workbook
+from Excel_Maker import sample_rosters
+from schema import FIRST_DATA_ROW, PROD_TEAM, QC_TEAM, layout
+from scoring import rank_descending, score
+
+formulas = pytest.importorskip('formulas')
+
+
+def evaluate(path):
+    """{(SHEET, coordinate): value} for every cell the formulas library computes."""
+    solution = formulas.ExcelModel().loads(path).finish().calculate()
+    values = {}
+    for key, ranges in solution.items():
+        book_sheet, _, coordinate = key.rpartition('!')
+        if ':' in coordinate or ']' not in book_sheet:
+            continue
+        sheet = book_sheet.strip("'").split(']', 1)[1]
+        values[(sheet.upper(), coordinate)] = ranges.value[0, 0]
+    return values
+
+
+def edge_rosters():
+    """
+    The sample rosters plus tied employees, blank metric cells and an
+    employee with no QC hours (an infinite Prod/QC ratio, written blank).
+    """
+    qc_data, prod_data = sample_rosters()
+    qc_tie = qc_data.iloc[[0]].assign(Name='qc_twin')
+    prod_tie = prod_data.iloc[[2]].assign(Name='prod_twin')
+    no_qc = prod_data.iloc[[0]].assign(Name='prod_no_qc', QCcheckingH=0.0)
+    no_qc['ProdToQCRatio'] = no_qc['ProductionH'] / no_qc['QCcheckingH']
+    qc_data = pd.concat([qc_data, qc_tie], ignore_index=True)
+    prod_data = pd.concat([prod_data, prod_tie, no_qc], ignore_index=True)
+    qc_data.loc[3, 'TLScore'] = np.nan
+    qc_data.loc[5, 'LeaveH'] = np.nan
+    prod_data.loc[1, 'Consistency'] = np.nan
+    prod_data.loc[4, 'AvgEvaluation'] = np.nan
+    return qc_data, prod_data
+
+
+def assert_matches_workbook(values, team, df):
+    lay = layout(team)
+    sheet = team.sheet.upper()
+    rows = range(FIRST_DATA_ROW, FIRST_DATA_ROW + len(df))
+    got_scores = np.array([float(values[(sheet, f'{lay.score}{r}')]) for r in rows])
+    got_ranks = np.array([int(values[(sheet, f'{lay.rank}{r}')]) for r in rows])
+
+    expected = score(df, metrics=team.metrics)
+    np.testing.assert_allclose(expected['FinalScore'].to_numpy(), got_scores, rtol=1e-12, atol=1e-12)
+    np.testing.assert_array_equal(expected['Rank'].to_numpy(), got_ranks)
+
+
+@pytest.mark.parametrize('sorted_rank_helper', [False, True], ids=['rank', 'sorted-rank'])
+@pytest.mark.parametrize('hoist_column_stats', [False, True], ids=['per-row', 'hoisted-stats'])
+@pytest.mark.parametrize('rosters', [sample_rosters, edge_rosters], ids=['sample', 'ties-and-blanks'])
+def test_score_matches_evaluated_workbook(tmp_path, rosters, hoist_column_stats, sorted_rank_helper):
+    qc_data, prod_data = rosters()
+    path = os.fspath(tmp_path / 'evaluation.xlsx')
+    build_workbook(path, qc_data, prod_data, hoist_column_stats=hoist_column_stats,
+                   sorted_rank_helper=sorted_rank_helper, verbose=False)
+    values = evaluate(path)
+    assert_matches_workbook(values, QC_TEAM, qc_data)
+    assert_matches_workbook(values, PROD_TEAM, prod_data)
+
+
+def test_ties_share_the_first_rank():
+    assert rank_descending([3.0, 5.0, 3.0, 1.0, 5.0]).tolist() == [3, 1, 3, 5, 1]
@@ -0,0 +1,45 @@
+import asyncio
+import os
+from http import HTTPStatus
+
+import pytest
+
+from schema import PROD_TEAM, compile_formulas
+from service import EvaluationService, RequestError, _read_request, scenario_team
+
+PROD_CSV = """Name,LeaveH,ProductionH,QCcheckingH,DistinctTasks,ProjectsWorked,TotalTasks,AvgEvaluation
+Liza,10,575,98,16,20,58,7.141
+Arif,0,709.1,74.4,12,34,162,7.253
+Lia,70,600,80,8,14,40,6.5
+"""
+
+
+def test_raw_exports_are_scored(tmp_path):
+    (tmp_path / 'prod.csv').write_text(PROD_CSV)
+    service = EvaluationService(os.fspath(tmp_path), processes=1)
+    try:
+        result, hit = asyncio.run(service.scores({'dataset': 'prod.csv', 'leave_threshold': 40}))
+    finally:
+        service.close()
+    assert result['team'] == 'Production' and not hit
+    assert [row['Name'] for row in result['scores']] == ['Liza', 'Arif', 'Lia']
+    assert sorted(row['Rank'] for row in result['scores']) == [1, 2, 3]
+
+
+@pytest.mark.parametrize('length', ['abc', '-5'])
+def test_malformed_content_length_is_a_bad_request(length):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(f'POST /scores HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}'.encode())
+        reader.feed_eof()
+        return await _read_request(reader)
+
+    with pytest.raises(RequestError) as excinfo:
+        asyncio.run(read())
+    assert excinfo.value.status == HTTPStatus.BAD_REQUEST
+
+
+def test_scenarios_share_compiled_formulas():
+    first = scenario_team(PROD_TEAM, [100] + [0] * 7, 30)
+    second = scenario_team(PROD_TEAM, [0] * 7 + [100], 60)
+    assert compile_formulas(first, 25) is compile_formulas(second, 25) is compile_formulas(PROD_TEAM, 25)
@@ -0,0 +1,31 @@
+import json
+import os
+
+from openpyxl import load_workbook
+
+from schema import PROD_TEAM
+from shards import MANIFEST_FILE, main
+
+PROD_CSV = """Name,Department,LeaveH,ProductionH,QCcheckingH,DistinctTasks,ProjectsWorked,TotalTasks,AvgEvaluation
+Liza,North,10,575,98,16,20,58,7.141
+Arif,,0,709.1,74.4,12,34,162,7.253
+Lia,North,20,600,80,8,14,40,6.5
+"""
+
+
+def test_blank_departments_and_default_consistency(tmp_path):
+    prod = tmp_path / 'prod.csv'
+    prod.write_text(PROD_CSV)
+    out = tmp_path / 'shards'
+    main(['--prod', os.fspath(prod), '-o', os.fspath(out), '--processes', '1'])
+
+    manifest = json.loads((out / MANIFEST_FILE).read_text(encoding='utf-8'))
+    shards = {entry['department']: entry for entry in manifest['shards']}
+    assert {department: entry['production_employees'] for department, entry in shards.items()} == {
+        'North': 2, None: 1}
+
+    ws = load_workbook(out / shards[None]['file'])[PROD_TEAM.sheet]
+    header = [cell.value for cell in ws[8]]
+    row = [cell.value for cell in ws[9]]
+    assert row[0] == 'Arif'
+    assert row[header.index('Consistency')] == 0.78
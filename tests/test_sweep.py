@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sweep
+from Excel_Maker import sample_rosters
+from schema import PROD_TEAM, QC_TEAM
+from scoring import score
+from sweep import EXCEL_MAX_ROWS, check_output_size, run_sweep, scenarios_path
+
+PROD_CSV = """Name,LeaveH,ProductionH,QCcheckingH,DistinctTasks,ProjectsWorked,TotalTasks,AvgEvaluation
+Cy,10,575,98,16,20,58,7.141
+Di,0,709.1,74.4,12,34,162,7.253
+Ed,50,612.5,0,12,30,150,6.9
+"""
+
+
+@pytest.mark.parametrize('team', [QC_TEAM, PROD_TEAM], ids=['qc', 'prod'])
+def test_ranks_match_scoring_for_every_scenario(team):
+    df = sample_rosters()[0 if team is QC_TEAM else 1]
+    weights = np.array([team.weights, [100 / len(team.metrics)] * len(team.metrics)])
+    scenarios, ranks = run_sweep(df, weights, leave_thresholds=(30, 50), processes=1)
+
+    assert scenarios['Scenario'].tolist() == [0, 1, 2, 3]
+    assert ranks.shape == (4, len(df)) and ranks.dtype == np.int32
+    for scenario in scenarios.itertuples(index=False):
+        weights = [getattr(scenario, column) for column in team.columns]
+        expected = score(df, weights, scenario.LeaveThreshold, team.metrics)
+        np.testing.assert_array_equal(ranks[scenario.Scenario], expected['Rank'].to_numpy())
+
+
+def test_blocks_arrive_in_scenario_order(monkeypatch):
+    df = sample_rosters()[1]
+    weights = sweep.weight_grid(len(PROD_TEAM.metrics), step=25)
+    serial = run_sweep(df, weights, (30, 50), processes=1)[1]
+    # One scenario per block, spread over two workers
+    monkeypatch.setattr(sweep, 'SCENARIO_BLOCK_CELLS', len(df))
+    np.testing.assert_array_equal(run_sweep(df, weights, (30, 50), processes=2)[1], serial)
+
+
+@pytest.mark.parametrize('ext', ['.parquet', '.csv'])
+def test_main_streams_ranks_of_a_raw_export(tmp_path, ext):
+    data = tmp_path / 'prod.csv'
+    data.write_text(PROD_CSV)
+    output = str(tmp_path / ('ranks' + ext))
+    sweep.main([str(data), '--grid-step', '50', '--thresholds', '40', '60', '-o', output])
+
+    read = pd.read_parquet if ext == '.parquet' else pd.read_csv
+    scenarios, table = read(scenarios_path(output)), read(output)
+    assert list(table.columns) == ['Scenario', 'Name', 'Rank']
+    assert len(table) == len(scenarios) * 3
+    assert table['Name'].astype(str).tolist()[:3] == ['Cy', 'Di', 'Ed']
+    assert scenarios['LeaveThreshold'].tolist() == [40.0] * 36 + [60.0] * 36
+
+
+def test_main_reports_a_file_of_no_team(tmp_path, capsys):
+    data = tmp_path / 'other.csv'
+    data.write_text("Name,Hours\nCy,10\n")
+    with pytest.raises(SystemExit) as exit_info:
+        sweep.main([str(data), '--grid-step', '50'])
+    assert exit_info.value.code == 2
+    assert 'neither a QC nor a Production export' in capsys.readouterr().err
+
+
+def test_duplicate_names_keep_their_own_rows(tmp_path):
+    qc_data = sample_rosters()[0]
+    twins = pd.concat([qc_data, qc_data.iloc[[0, 1]].assign(Name=qc_data['Name'].iloc[0])], ignore_index=True)
+    scenarios, ranks = run_sweep(twins, [QC_TEAM.weights], processes=1)
+    output = str(tmp_path / 'ranks.csv')
+    sweep.write_comparison(output, scenarios, [(0, ranks)], twins['Name'])
+    table = pd.read_csv(output)
+    assert len(table) == len(twins)
+    assert (table['Name'] == qc_data['Name'].iloc[0]).sum() == 3
+
+
+def test_xlsx_output_is_limited_to_one_sheet():
+    check_output_size('ranks.parquet', 10 * EXCEL_MAX_ROWS)
+    with pytest.raises(ValueError):
+        check_output_size('ranks.xlsx', EXCEL_MAX_ROWS)
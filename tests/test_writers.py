@@ -0,0 +1,191 @@
+import itertools
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from openpyxl.worksheet.formula import ArrayFormula
+
+from builder import populate_workbook, save_workbook
+from collect import read_workbook
+from Excel_Maker import sample_rosters
+from schema import PROD_TEAM, QC_TEAM, compile_formulas
+from writers import WRITERS, export_scores
+
+REFERENCE = 'openpyxl'
+CHECKED_OPTIONS = ('hoist_column_stats', 'precompute_values', 'sorted_rank_helper')
+COMBINATIONS = [dict(zip(CHECKED_OPTIONS, combo))
+                for combo in itertools.product((False, True), repeat=len(CHECKED_OPTIONS))]
+VARIANTS = [(f'{REFERENCE}-streaming', REFERENCE, {'streaming_write': True})]
+VARIANTS += [(writer, writer, {}) for writer in WRITERS if writer != REFERENCE]
+
+
+# Small rosters: every backend and option combination is built and compared
+# cell by cell against the openpyxl reference
+def rosters():
+    qc_data, prod_data = sample_rosters()
+    # A blank cell, a non-finite value and a tie in each roster
+    qc_data.loc[3, 'TLScore'] = np.nan
+    qc_data.loc[6, 'TotalWorkHrs'] = -np.inf
+    prod_data.loc[1, 'Consistency'] = np.nan
+    prod_data.loc[4, 'ProdToQCRatio'] = np.inf
+    prod_data.loc[5, prod_data.columns[1:]] = prod_data.loc[2, prod_data.columns[1:]]
+    return [(QC_TEAM, qc_data), (PROD_TEAM, prod_data)]
+
+
+def build(path, writer, **options):
+    out, cached = populate_workbook(rosters(), verbose=False, writer=writer, **options)
+    save_workbook(out, path, cached)
+    return path
+
+
+def _same_value(a, b):
+    if a == '':
+        a = None
+    if b == '':
+        b = None
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)) and not isinstance(a, bool):
+        return math.isclose(a, b, rel_tol=1e-15, abs_tol=1e-300)
+    return a == b
+
+
+def _value(cell):
+    if isinstance(cell.value, ArrayFormula):
+        return ('array', cell.value.ref, cell.value.text)
+    return cell.value
+
+
+def _color(color):
+    return color.rgb[-6:] if color is not None and isinstance(color.rgb, str) else None
+
+
+def _style(cell):
+    font, fill, border, alignment = cell.font, cell.fill, cell.border, cell.alignment
+    return (
+        bool(font.b), bool(font.i), float(font.sz or 11), _color(font.color),
+        fill.fill_type, _color(fill.fgColor) if fill.fill_type else None,
+        tuple(getattr(border, side).style for side in ('left', 'right', 'top', 'bottom')),
+        alignment.horizontal, alignment.vertical,
+        cell.number_format,
+    )
+
+
+def _columns(ws):
+    columns = {}
+    for letter, dim in ws.column_dimensions.items():
+        # openpyxl groups equal adjacent columns; spread them out again
+        for index in range(dim.min or 1, (dim.max or dim.min or 1) + 1):
+            width = round(dim.width, 4) if dim.customWidth else None
+            if width or dim.hidden:
+                columns[index] = (width, bool(dim.hidden))
+    return columns
+
+
+def compare_workbooks(reference, candidate):
+    """Differences between two workbook files, as messages."""
+    problems = []
+    for data_only in (False, True):
+        ref_wb = load_workbook(reference, data_only=data_only)
+        new_wb = load_workbook(candidate, data_only=data_only)
+        if ref_wb.sheetnames != new_wb.sheetnames:
+            return [f"sheets {ref_wb.sheetnames} != {new_wb.sheetnames}"]
+        for ref, new in zip(ref_wb.worksheets, new_wb.worksheets):
+            kind = 'cached' if data_only else 'cell'
+            covered = set()
+            if not data_only:
+                ref_merges = sorted(str(r) for r in ref.merged_cells.ranges)
+                new_merges = sorted(str(r) for r in new.merged_cells.ranges)
+                if ref_merges != new_merges:
+                    problems.append(f"{ref.title}: merges {ref_merges} != {new_merges}")
+                # Only the anchor of a merged range is shown; the rest may differ
+                for merged in ref.merged_cells.ranges:
+                    covered.update(merged.cells)
+                    covered.discard((merged.min_row, merged.min_col))
+                if _columns(ref) != _columns(new):
+                    problems.append(f"{ref.title}: columns {_columns(ref)} != {_columns(new)}")
+
+            rows = max(ref.max_row, new.max_row)
+            cols = max(ref.max_column, new.max_column)
+            for ref_row, new_row in zip(ref.iter_rows(max_row=rows, max_col=cols),
+                                        new.iter_rows(max_row=rows, max_col=cols)):
+                for a, b in zip(ref_row, new_row):
+                    if (a.row, a.column) in covered:
+                        continue
+                    if not _same_value(_value(a), _value(b)):
+                        problems.append(f"{ref.title}: {kind} {a.coordinate}: {_value(a)!r} != {_value(b)!r}")
+                    elif not data_only and _style(a) != _style(b):
+                        problems.append(f"{ref.title}: style {a.coordinate}: {_style(a)} != {_style(b)}")
+    return problems
+
+
+def compare_collected(reference, candidate):
+    """Differences between what collect.py reads from two workbooks."""
+    problems = []
+    for ref, new in zip(read_workbook(reference), read_workbook(candidate)):
+        title = ref.team.sheet
+        if ref.weights != new.weights or ref.threshold != new.threshold or ref.names != new.names:
+            problems.append(f"{title}: collected weights, threshold or names differ")
+        if not np.allclose(ref.scores, new.scores, rtol=1e-15, atol=0, equal_nan=True) \
+                or not np.array_equal(ref.ranks, new.ranks):
+            problems.append(f"{title}: collected scores or ranks differ")
+        if ref.source != new.source:
+            problems.append(f"{title}: score source {ref.source} != {new.source}")
+    return problems
+
+
+@pytest.fixture(scope='module')
+def references(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp('reference')
+    return [build(os.fspath(workdir / f'reference{i}.xlsx'), REFERENCE, **options)
+            for i, options in enumerate(COMBINATIONS)]
+
+
+@pytest.mark.parametrize('name, writer, extra', VARIANTS, ids=[name for name, _, _ in VARIANTS])
+@pytest.mark.parametrize('combination', range(len(COMBINATIONS)),
+                         ids=['+'.join(n for n, on in c.items() if on) or 'defaults' for c in COMBINATIONS])
+def test_backend_matches_reference(tmp_path, references, combination, name, writer, extra):
+    candidate = build(os.fspath(tmp_path / 'candidate.xlsx'), writer, **COMBINATIONS[combination], **extra)
+    reference = references[combination]
+    assert compare_workbooks(reference, candidate) + compare_collected(reference, candidate) == []
+
+
+@pytest.mark.parametrize('ext', ['.csv', '.parquet'])
+def test_score_export_matches_reference(tmp_path, references, ext):
+    reference = references[COMBINATIONS.index(dict(COMBINATIONS[0], precompute_values=True))]
+    path = os.fspath(tmp_path / ('scores' + ext))
+    export_scores(path, rosters())
+    table = pd.read_csv(path) if ext == '.csv' else pd.read_parquet(path)
+    for sheet in read_workbook(reference):
+        rows = table[table['Team'] == sheet.team.short]
+        assert rows['Name'].astype(str).tolist() == [str(name) for name in sheet.names]
+        np.testing.assert_allclose(rows['FinalScore'], sheet.scores, rtol=1e-15, atol=0)
+        np.testing.assert_array_equal(rows['Rank'], sheet.ranks)
+
+
+@pytest.mark.parametrize('team', [QC_TEAM, PROD_TEAM], ids=['qc', 'prod'])
+@pytest.mark.parametrize('hoist, helper', [(False, False), (True, True)], ids=['plain', 'hoisted'])
+def test_template_formulas_match_xlsxwriter(team, hoist, helper):
+    pytest.importorskip('xlsxwriter')
+    from xlsxwriter.worksheet import Worksheet
+
+    from writers import _template_worksheet
+
+    formulas = compile_formulas(team, 20, hoist, helper)
+    texts = [formulas.score(9), formulas.rank(9)] + [formula for _, formula in formulas.stats]
+    if helper:
+        texts += [formulas.sort, formulas.group_rank.format(r=10, p=9)]
+    template, stock = _template_worksheet()(), Worksheet()
+    for text in texts:
+        assert template._prepare_formula(text) == stock._prepare_formula(text)
+
+
+def test_untested_xlsxwriter_prepares_every_formula(monkeypatch):
+    xlsxwriter = pytest.importorskip('xlsxwriter')
+    from xlsxwriter.worksheet import Worksheet
+
+    from writers import _template_worksheet
+
+    monkeypatch.setattr(xlsxwriter, '__version__', '4.0.0')
+    assert _template_worksheet() is Worksheet
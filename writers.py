@@ -0,0 +1,413 @@
+"""
+================================================================================
+WORKBOOK WRITERS - OUTPUT BACKENDS BEHIND THE SHEET BUILDERS
+================================================================================
+
+builder.py lays out every sheet through a small writer interface instead of
+calling openpyxl directly, so the same layout code can target more than one
+xlsx library:
+
+    openpyxl     the reference implementation; regular or write-only
+                 (STREAMING_WRITE) workbooks, styles as NamedStyles
+    xlsxwriter   xlsxwriter in constant_memory mode: each row is flushed to
+                 a temporary file as soon as the next one starts, so memory
+                 stays flat, like STREAMING_WRITE, at a lower cost per row
+
+A writer hands out one sheet object per title. A sheet takes header-region
+cells (cell, merge, column) in any order, then start_rows() and the data
+rows in order, then finish(). Both backends write the same values,
+formulas, merges, column widths, hidden columns and formatting
+(tests/test_writers.py compares them cell by cell). Both store data values
+with 16 significant digits (%.16g) and cached formula results
+(PRECOMPUTE_VALUES) as repr(float), the shortest form that reads back as the
+same double, which may take 17. One difference is inherent to xlsxwriter: it
+has no named cell styles, so the palette of sheet_writer.py becomes plain
+cell formats.
+
+Consumers that only need the scores can skip spreadsheet generation
+altogether: export_scores writes FINAL SCORE and RANK per employee to a CSV
+or Parquet file.
+
+Build + save time, 100,000 employees per team (benchmarks/writer_timing.py):
+
+    openpyxl              57 s
+    openpyxl, streaming   75 s
+    xlsxwriter            44 s
+    score export          0.3 s (Parquet)
+
+Usage:
+    writer = open_writer('xlsxwriter', [INSTRUCTIONS_SHEET, QC_SHEET, PROD_SHEET])
+    export_scores("scores.parquet", [(QC_TEAM, qc_data), (PROD_TEAM, prod_data)])
+"""
+
+import math
+import os
+import re
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.utils import column_index_from_string, get_column_letter, range_boundaries
+from openpyxl.utils.cell import coordinate_from_string
+from openpyxl.worksheet.formula import ArrayFormula
+
+from cached_values import embed_cached_values
+from profiling import NULL_PROFILER
+from scoring import score
+from sheet_writer import (NAMED_STYLES, NAME, VALUE, SCORE, RANK,
+                          data_row_cells, data_row_styles, register_styles, stream_staged_sheet)
+
+WRITERS = ('openpyxl', 'xlsxwriter')
+SCORE_FORMATS = ('.csv', '.parquet')
+
+# xlsxwriter stores a column width w as w + 0.7109375 (its cell padding);
+# openpyxl stores w as given, and 13 for columns given no width
+XLSXWRITER_WIDTH_PADDING = 0.7109375
+OPENPYXL_COLUMN_WIDTH = 13
+
+# Worksheet functions stored without an _xlfn. prefix. xlsxwriter runs dozens
+# of regex substitutions over every formula to add such prefixes; formulas
+# calling only these functions (all of the row templates) skip that pass
+PLAIN_FUNCTIONS = frozenset({'SUM', 'IF', 'MIN', 'MAX', 'INDEX', 'MATCH', 'RANK', 'ROW'})
+FUNCTION_CALL = re.compile(r'([A-Za-z_][A-Za-z0-9._]*)\(')
+
+# The skip overrides xlsxwriter's private Worksheet._prepare_formula, so it is
+# only taken on the versions it is tested against; others prepare every formula
+XLSXWRITER_TEMPLATE_VERSIONS = ('3.2.',)
+
+BORDER_STYLES = {'thin': 1, 'medium': 2, 'dashed': 3, 'dotted': 4, 'thick': 5, 'double': 6, 'hair': 7}
+VERTICAL_ALIGN = {'center': 'vcenter', 'top': 'top', 'bottom': 'bottom'}
+
+
+def open_writer(backend, titles, streaming_write=False):
+    """
+    A writer for `backend` ('openpyxl' or 'xlsxwriter'). `titles` lists every
+    sheet in workbook order; xlsxwriter creates them all up front.
+    `streaming_write` selects openpyxl's write-only mode; xlsxwriter always
+    streams.
+    """
+    if backend == 'openpyxl':
+        return OpenpyxlWriter(streaming_write)
+    if backend == 'xlsxwriter':
+        return XlsxWriterWriter(titles)
+    raise ValueError(f"unknown writer {backend!r}; choose from {', '.join(WRITERS)}")
+
+
+# ============================================================================
+# OPENPYXL (REFERENCE)
+# ============================================================================
+
+class OpenpyxlSheet:
+    """One openpyxl sheet; with a write-only workbook the header region is staged."""
+
+    def __init__(self, writer, title, index=None):
+        self.writer = writer
+        self.title = title
+        self.index = index
+        self.ws = (writer.staging_wb or writer.wb).create_sheet(title, index)
+        register_styles(self.ws.parent)
+        self.out = None
+        self.styles = None
+
+    def cell(self, coord, value, style=None):
+        cell = self.ws[coord]
+        cell.value = value
+        if style is not None:
+            cell.style = style
+
+    def merge(self, cell_range):
+        self.ws.merge_cells(cell_range)
+
+    def column(self, letter, width=None, hidden=False):
+        dim = self.ws.column_dimensions[letter]
+        if width is not None:
+            dim.width = width
+        if hidden:
+            dim.hidden = True
+
+    def _flush(self):
+        if self.writer.staging_wb is not None:
+            self.out = self.writer.wb.create_sheet(self.title, self.index)
+            stream_staged_sheet(self.ws, self.out)
+        else:
+            self.out = self.ws
+
+    def start_rows(self, cached=None):
+        """
+        Flush the staged header region and resolve the data-row styles.
+        Cached values are embedded after the save (see OpenpyxlWriter.save).
+        """
+        self._flush()
+        self.styles = data_row_styles(self.out)
+
+    def data_row(self, r, values, score_formula, rank_formula, extra=None):
+        """Append row `r`: Name, metric values, FINAL SCORE, RANK, then `extra` cells."""
+        cells = data_row_cells(self.out, self.styles, values, score_formula, rank_formula)
+        if extra:
+            cells.extend(extra)
+        self.out.append(cells)
+
+    def finish(self):
+        if self.out is None:
+            self._flush()
+
+
+class OpenpyxlWriter:
+    """openpyxl Workbook, regular or write-only."""
+
+    def __init__(self, streaming_write=False):
+        self.staging_wb = None
+        if streaming_write:
+            self.wb = Workbook(write_only=True)
+            self.staging_wb = Workbook()  # header regions are laid out here first
+            self.staging_wb.remove(self.staging_wb.active)
+        else:
+            self.wb = Workbook()
+            self.wb.remove(self.wb.active)
+
+    def sheet(self, title, index=None):
+        return OpenpyxlSheet(self, title, index)
+
+    def save(self, output_file, cached=None, profiler=NULL_PROFILER):
+        if cached is not None:
+            # Cached values are current, so skip the forced recalculation on open
+            self.wb.calculation.fullCalcOnLoad = False
+        self.wb.save(output_file)
+        if cached is not None:
+            with profiler.span("save:cached_values"):
+                embed_cached_values(output_file, cached)
+
+
+# ============================================================================
+# XLSXWRITER (CONSTANT MEMORY)
+# ============================================================================
+
+def _rgb(color):
+    return '#' + color.rgb[-6:]
+
+
+def xlsxwriter_format(attrs):
+    """xlsxwriter format properties for a NAMED_STYLES entry."""
+    props = {}
+    font = attrs.get('font')
+    if font is not None:
+        if font.b:
+            props['bold'] = True
+        if font.i:
+            props['italic'] = True
+        if font.sz:
+            props['font_size'] = font.sz
+        if font.color is not None and font.color.rgb:
+            props['font_color'] = _rgb(font.color)
+    fill = attrs.get('fill')
+    if fill is not None and fill.fill_type == 'solid':
+        props['pattern'] = 1
+        props['bg_color'] = _rgb(fill.fgColor)
+    border = attrs.get('border')
+    if border is not None:
+        for side in ('left', 'right', 'top', 'bottom'):
+            style = getattr(border, side).style
+            if style:
+                props[side] = BORDER_STYLES[style]
+    alignment = attrs.get('alignment')
+    if alignment is not None:
+        if alignment.horizontal:
+            props['align'] = alignment.horizontal
+        if alignment.vertical:
+            props['valign'] = VERTICAL_ALIGN[alignment.vertical]
+    if attrs.get('number_format'):
+        props['num_format'] = attrs['number_format']
+    return props
+
+
+def _template_worksheet():
+    """
+    An xlsxwriter Worksheet class that writes PLAIN_FUNCTIONS formulas as
+    given, or the stock Worksheet outside XLSXWRITER_TEMPLATE_VERSIONS.
+    """
+    import xlsxwriter
+    from xlsxwriter.worksheet import Worksheet
+
+    if not xlsxwriter.__version__.startswith(XLSXWRITER_TEMPLATE_VERSIONS):
+        return Worksheet
+
+    class TemplateWorksheet(Worksheet):
+        def _prepare_formula(self, formula, expand_future_functions=False):
+            if formula.startswith('=') and PLAIN_FUNCTIONS.issuperset(FUNCTION_CALL.findall(formula)):
+                return formula[1:]
+            return super()._prepare_formula(formula, expand_future_functions)
+
+    return TemplateWorksheet
+
+
+class XlsxWriterSheet:
+    """
+    One xlsxwriter worksheet. constant_memory only accepts rows in ascending
+    order, so header-region cells and merges are held until start_rows()
+    and written row by row.
+    """
+
+    def __init__(self, worksheet, formats):
+        self.ws = worksheet
+        self.formats = formats
+        self.cells = {}    # (row, col), 0-based -> (value, style)
+        self.merges = {}   # anchor (row, col) -> (last row, last col)
+        self.cached = {}
+        self.flushed = False
+        self.result_cols = None
+
+    def cell(self, coord, value, style=None):
+        letter, row = coordinate_from_string(coord)
+        self.cells[row - 1, column_index_from_string(letter) - 1] = (value, style)
+
+    def merge(self, cell_range):
+        min_col, min_row, max_col, max_row = range_boundaries(cell_range)
+        self.merges[min_row - 1, min_col - 1] = (max_row - 1, max_col - 1)
+
+    def column(self, letter, width=None, hidden=False):
+        col = column_index_from_string(letter) - 1
+        options = {'hidden': True} if hidden else {}
+        if width is None:
+            width = OPENPYXL_COLUMN_WIDTH
+        self.ws.set_column(col, col, width - XLSXWRITER_WIDTH_PADDING, None, options)
+
+    def _write(self, row, col, value, fmt):
+        if isinstance(value, str):
+            if value.startswith('='):
+                coord = f'{get_column_letter(col + 1)}{row + 1}'
+                self.ws.write_formula(row, col, value, fmt, self.cached.get(coord, ''))
+            else:
+                self.ws.write_string(row, col, value, fmt)
+        elif value is None or (isinstance(value, float) and not math.isfinite(value)):
+            # openpyxl writes NaN and inf as empty cells too
+            self.ws.write_blank(row, col, None, fmt)
+        elif isinstance(value, bool):
+            self.ws.write_boolean(row, col, value, fmt)
+        else:
+            self.ws.write_number(row, col, value, fmt)
+
+    def start_rows(self, cached=None):
+        """Write the held header region in row order; `cached` fills formula results."""
+        self.cached = cached or {}
+        covered = set()
+        for (row, col), (last_row, last_col) in self.merges.items():
+            covered.update((r, c) for r in range(row, last_row + 1) for c in range(col, last_col + 1))
+        for row, col in sorted(covered.union(self.cells)):
+            value, style = self.cells.get((row, col), (None, None))
+            fmt = self.formats.get(style)
+            if (row, col) in self.merges:
+                last_row, last_col = self.merges[row, col]
+                self.ws.merge_range(row, col, last_row, last_col, '', fmt)
+                if value is not None:
+                    self._write(row, col, value, fmt)
+            elif (row, col) not in covered:
+                self._write(row, col, value, fmt)
+        self.flushed = True
+
+    def data_row(self, r, values, score_formula, rank_formula, extra=None):
+        """Write row `r`: Name, metric values, FINAL SCORE, RANK, then `extra` cells."""
+        ws, formats = self.ws, self.formats
+        row = r - 1
+        n = len(values)
+        if self.result_cols is None:
+            self.result_cols = get_column_letter(n + 1), get_column_letter(n + 2)
+        score_col, rank_col = self.result_cols
+
+        self._write(row, 0, values[0], formats[NAME])
+        value_fmt = formats[VALUE]
+        for col in range(1, n):
+            value = values[col]
+            if value is None or not math.isfinite(value):
+                ws.write_blank(row, col, None, value_fmt)
+            else:
+                ws.write_number(row, col, value, value_fmt)
+        ws.write_formula(row, n, score_formula, formats[SCORE], self.cached.get(f'{score_col}{r}', ''))
+        ws.write_formula(row, n + 1, rank_formula, formats[RANK], self.cached.get(f'{rank_col}{r}', ''))
+
+        for col, value in enumerate(extra or (), start=n + 2):
+            if isinstance(value, ArrayFormula):
+                min_col, min_row, max_col, max_row = range_boundaries(value.ref)
+                ws.write_array_formula(min_row - 1, min_col - 1, max_row - 1, max_col - 1,
+                                       value.text, None, '')
+            elif value is not None:
+                self._write(row, col, value, None)
+
+    def finish(self):
+        if not self.flushed:
+            self.start_rows()
+
+
+class XlsxWriterWriter:
+    """xlsxwriter Workbook in constant_memory mode with every sheet created up front."""
+
+    def __init__(self, titles):
+        import xlsxwriter
+
+        # The file name is given at save time
+        self.wb = xlsxwriter.Workbook(None, {'constant_memory': True})
+        self.formats = {name: self.wb.add_format(xlsxwriter_format(attrs))
+                        for name, attrs in NAMED_STYLES.items()}
+        self.formats[None] = None
+        worksheet_class = _template_worksheet()
+        self.sheets = {title: XlsxWriterSheet(self.wb.add_worksheet(title, worksheet_class), self.formats)
+                       for title in titles}
+
+    def sheet(self, title, index=None):
+        if title not in self.sheets:
+            raise ValueError(f"sheet {title!r} was not declared when the writer was opened")
+        return self.sheets[title]
+
+    def save(self, output_file, cached=None, profiler=NULL_PROFILER):
+        """Close the workbook into `output_file`; cached values were written with the cells."""
+        for sheet in self.sheets.values():
+            sheet.finish()
+        if cached is not None:
+            self.wb.calc_on_load = False
+        self.wb.filename = output_file
+        self.wb.close()
+
+
+# ============================================================================
+# SCORE EXPORT
+# ============================================================================
+
+def scores_frame(rosters):
+    """
+    FINAL SCORE and RANK of every employee in `rosters` ((team, roster)
+    pairs) with the template's default weights and leave thresholds: Team,
+    Name, FinalScore and Rank, the columns collect.py reads from workbooks.
+    """
+    frames = []
+    for team, df in rosters:
+        if df is None or not len(df):
+            continue
+        result = score(df, team.weights, team.leave_threshold, team.metrics)
+        frames.append(pd.DataFrame({
+            'Team': team.short,
+            'Name': df['Name'].astype(str).to_numpy(),
+            'FinalScore': result['FinalScore'].to_numpy(),
+            'Rank': result['Rank'].to_numpy(),
+        }))
+    if not frames:
+        return pd.DataFrame({'Team': [], 'Name': [], 'FinalScore': [], 'Rank': []})
+    table = pd.concat(frames, ignore_index=True)
+    table['Team'] = table['Team'].astype('category')
+    return table
+
+
+def export_scores(output_file, rosters, profiler=NULL_PROFILER):
+    """
+    Write the scores of `rosters` to a .csv or .parquet file instead of
+    building a workbook. Returns the file name.
+    """
+    ext = os.path.splitext(output_file)[1].lower()
+    if ext not in SCORE_FORMATS:
+        raise ValueError(f"score export writes {' or '.join(SCORE_FORMATS)} files, not {output_file!r}")
+    with profiler.span("export_scores") as span:
+        table = scores_frame(rosters)
+        if ext == '.parquet':
+            table.to_parquet(output_file, index=False)
+        else:
+            table.to_csv(output_file, index=False)
+        span.rows = len(table)
+        span.attrs['output_bytes'] = os.path.getsize(output_file)
+    return output_file